@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Root directory for everything the backend caches on local disk
+CACHE_DIR = os.getenv("SMARTINTERN_CACHE_DIR", os.path.join(tempfile.gettempdir(), "smartintern"))
+
+
+class SQLiteCache:
+    """
+    Persistent key -> JSON value cache backed by a single SQLite file.
+
+    Entries expire ttl_seconds after they are written. Once more than max_entries
+    are stored, the least recently read entries are evicted; eviction runs at most every
+    evict_interval_seconds, so the table can briefly hold a few more. Read times are only
+    rewritten when they are older than that interval too.
+
+    Every call does blocking SQLite I/O: async code uses aget()/aset(), which run it in
+    the default thread pool.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, evict_interval_seconds: float = 60.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_interval_seconds = evict_interval_seconds
+        self._next_evict = 0.0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Returns the cached value, or None if the key is missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at, accessed_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            if now - row[2] >= self.evict_interval_seconds:
+                self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            if now >= self._next_evict:
+                self._evict(now)
+                self._next_evict = now + self.evict_interval_seconds
+            self._conn.commit()
+
+    async def aget(self, key: str):
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def aset(self, key: str, value):
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        overflow = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,160 @@
+import os
+
+from agents.llm_clients import get_async_client
+from agents.tokenizer import count_tokens
+
+LLM_MODEL = "gpt-3.5-turbo"
+
+# The newest messages are always kept word for word; older ones are folded into a summary
+MEMORY_RECENT_TURNS = int(os.getenv("MEMORY_RECENT_TURNS", "6"))
+# Token budget for the whole history block (summary + recent messages) in a prompt
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1200"))
+# Share of the budget the summary may use; the rest goes to the recent messages
+MEMORY_SUMMARY_SHARE = float(os.getenv("MEMORY_SUMMARY_SHARE", "0.4"))
+# Words kept per message when older messages are condensed without the LLM
+EXTRACTIVE_WORDS_PER_TURN = 30
+
+
+def format_turns(turns: list[dict]) -> str:
+    return "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in turns])
+
+
+# Cheap stand-in for the LLM summary: the start of every message, newest last
+def extractive_summary(turns: list[dict]) -> str:
+    lines = []
+    for msg in turns:
+        words = msg["content"].split()
+        text = " ".join(words[:EXTRACTIVE_WORDS_PER_TURN]) + (" ..." if len(words) > EXTRACTIVE_WORDS_PER_TURN else "")
+        lines.append(f"{msg['role'].capitalize()}: {text}")
+    return "\n".join(lines)
+
+
+# Keeps the last lines of text that fit in max_tokens
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    lines = text.split("\n")
+    kept, used = [], 0
+    for line in reversed(lines):
+        tokens = count_tokens(line) + 1
+        if used + tokens > max_tokens:
+            break
+        kept.append(line)
+        used += tokens
+    return "\n".join(reversed(kept))
+
+
+class ConversationMemory:
+    """
+    Rolling memory of a chat: the last recent_turns messages verbatim, plus a running
+    summary of everything older, rendered under a fixed token budget.
+
+    The summary is updated incrementally: afold() folds the messages that have left the
+    recent window into it with one LLM call, and only when at least recent_turns of them
+    have piled up. Until then render() condenses them extractively, so rendering never
+    waits on the LLM. State round-trips through to_dict()/from_dict() for session storage.
+
+    The token count of the full history (logged next to the rendered one) is kept as a
+    running total, so each render only tokenizes the messages it hasn't counted yet.
+    """
+
+    def __init__(self, summary: str = "", summarized_turns: int = 0, counted_turns: int = 0, counted_tokens: int = 0,
+                 recent_turns: int = MEMORY_RECENT_TURNS, token_budget: int = MEMORY_TOKEN_BUDGET):
+        self.summary = summary
+        self.summarized_turns = summarized_turns  # messages already folded into the summary
+        self.counted_turns = counted_turns        # messages already in counted_tokens
+        self.counted_tokens = counted_tokens
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.last_render_stats = {}
+
+    @classmethod
+    def from_dict(cls, state: dict = None, **kwargs):
+        state = state or {}
+        return cls(summary=state.get("summary", ""), summarized_turns=state.get("summarized_turns", 0),
+                   counted_turns=state.get("counted_turns", 0), counted_tokens=state.get("counted_tokens", 0), **kwargs)
+
+    def to_dict(self) -> dict:
+        return {"summary": self.summary, "summarized_turns": self.summarized_turns,
+                "counted_turns": self.counted_turns, "counted_tokens": self.counted_tokens}
+
+    def _split(self, chat_history: list[dict]) -> tuple[list[dict], list[dict]]:
+        """(older messages not yet in the summary, recent messages)"""
+        # A shorter history than last time means it was reset: start over
+        if self.summarized_turns > len(chat_history):
+            self.summary, self.summarized_turns = "", 0
+        window_start = max(self.summarized_turns, len(chat_history) - self.recent_turns)
+        return chat_history[self.summarized_turns:window_start], chat_history[window_start:]
+
+    def full_history_tokens(self, chat_history: list[dict]) -> int:
+        """About count_tokens(format_turns(chat_history)), tokenizing only the messages added since the last call."""
+        if self.counted_turns > len(chat_history):
+            self.counted_turns, self.counted_tokens = 0, 0
+        # One token per message for the newline that joins them
+        self.counted_tokens += sum(count_tokens(format_turns([msg])) + 1 for msg in chat_history[self.counted_turns:])
+        self.counted_turns = len(chat_history)
+        return max(0, self.counted_tokens - 1)
+
+    def needs_fold(self, chat_history: list[dict]) -> bool:
+        pending, _ = self._split(chat_history)
+        return len(pending) >= max(1, self.recent_turns)
+
+    async def afold(self, chat_history: list[dict]) -> bool:
+        """Folds the messages that left the recent window into the summary. Returns True if it did."""
+        pending, _ = self._split(chat_history)
+        if not pending:
+            return False
+        summary_budget = int(self.token_budget * MEMORY_SUMMARY_SHARE)
+        try:
+            response = await get_async_client().chat.completions.create(
+                model=LLM_MODEL,
+                messages=build_fold_messages(self.summary, pending, summary_budget),
+                temperature=0.2,
+            )
+            new_summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Error in folding conversation memory: {e}", flush=True)
+            new_summary = "\n".join(part for part in (self.summary, extractive_summary(pending)) if part)
+        self.summary = trim_to_tokens(new_summary, summary_budget)
+        self.summarized_turns += len(pending)
+        return True
+
+    def render(self, chat_history: list[dict]) -> str:
+        """The history block for a prompt: summary of older messages, then recent ones verbatim."""
+        pending, recent = self._split(chat_history)
+        summary_budget = int(self.token_budget * MEMORY_SUMMARY_SHARE)
+        summary = "\n".join(part for part in (self.summary, extractive_summary(pending)) if part)
+        summary = trim_to_tokens(summary, summary_budget) if summary else ""
+
+        # The newest messages win when the recent window alone is over budget
+        recent_text = trim_to_tokens(format_turns(recent), self.token_budget - count_tokens(summary))
+
+        rendered = recent_text
+        if summary:
+            rendered = f"Summary of the earlier conversation:\n{summary}\n\nRecent messages:\n{recent_text}"
+
+        self.last_render_stats = {
+            "history_turns": len(chat_history),
+            "summarized_turns": self.summarized_turns,
+            "history_tokens": count_tokens(rendered),
+            "full_history_tokens": self.full_history_tokens(chat_history),
+        }
+        return rendered
+
+
+def build_fold_messages(summary: str, turns: list[dict], max_tokens: int) -> list[dict]:
+    prompt = f"""
+    Update the running summary of a conversation between a job seeker and a job search assistant.
+    Keep every stated preference (roles, seniority, locations, industries, tech stack, work mode),
+    constraints and decisions; drop pleasantries. Reply with the updated summary only, in at most
+    {max_tokens * 3 // 4} words.
+
+    Current summary:
+    {summary or "(none yet)"}
+
+    New messages:
+    {format_turns(turns)}
+    """.strip()
+
+    return [
+        {"role": "system", "content": "You summarize conversations faithfully and concisely."},
+        {"role": "user", "content": prompt}
+    ]
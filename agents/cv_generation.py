@@ -1,12 +1,16 @@
 from dotenv import load_dotenv
-from openai import OpenAI
+from agents.llm_clients import get_client, get_async_client
+import asyncio
 import os
 
 LLM_MODEL = "gpt-3.5-turbo"
 
+# Limits for batch generation: letters in flight at once, and letters started per minute
+COVER_LETTER_MAX_CONCURRENCY = int(os.getenv("COVER_LETTER_MAX_CONCURRENCY", "4"))
+COVER_LETTER_REQUESTS_PER_MINUTE = int(os.getenv("COVER_LETTER_REQUESTS_PER_MINUTE", "60"))
+
 # Loading the environment variables from .env file
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 def format_resume_summary(resume_summary: dict) -> str:
     return f"""
@@ -31,41 +35,46 @@ def format_job_details(job_details: dict) -> str:
     {job_details.get('job_description', 'N/A')}
     """.strip()
 
-def generate_cover_letter(resume_summary: dict, job_details: dict) -> str:
-    try:
+# formatted_resume can be passed in when the same resume is used for many jobs
+def build_cover_letter_messages(resume_summary: dict, job_details: dict, formatted_resume: str = None) -> list[dict]:
+    if formatted_resume is None:
         formatted_resume = format_resume_summary(resume_summary)
-        formatted_job = format_job_details(job_details)
+    formatted_job = format_job_details(job_details)
+
+    prompt = f"""
+    You are a professional cover letter writer. Create a personalized cover letter that showcases the candidate's strengths and alignment with the job requirements.
 
-        prompt = f"""
-        You are a professional cover letter writer. Create a personalized cover letter that showcases the candidate's strengths and alignment with the job requirements.
+    CANDIDATE INFORMATION:
+    {formatted_resume}
 
-        CANDIDATE INFORMATION:
-        {formatted_resume}
+    TARGET POSITION:
+    {formatted_job}
 
-        TARGET POSITION:
-        {formatted_job}
+    Guidelines:
+    1. Begin with a professional greeting
+    2. Express enthusiasm for the specific role and company
+    3. Connect candidate's experience with job requirements
+    4. Highlight relevant projects and achievements
+    5. Express willingness for interview
+    6. End with a professional closing
+    7. Keep length to 300-400 words
+    8. Use formal business letter format
+    9. Focus on value proposition
+    10. Include specific examples from projects
 
-        Guidelines:
-        1. Begin with a professional greeting
-        2. Express enthusiasm for the specific role and company
-        3. Connect candidate's experience with job requirements
-        4. Highlight relevant projects and achievements
-        5. Express willingness for interview
-        6. End with a professional closing
-        7. Keep length to 300-400 words
-        8. Use formal business letter format
-        9. Focus on value proposition
-        10. Include specific examples from projects
+    Generate a compelling cover letter following these guidelines.
+    """
 
-        Generate a compelling cover letter following these guidelines.
-        """
+    return [
+        {"role": "system", "content": "You are an expert cover letter writer."},
+        {"role": "user", "content": prompt}
+    ]
 
-        response = client.chat.completions.create(
+def generate_cover_letter(resume_summary: dict, job_details: dict) -> str:
+    try:
+        response = get_client().chat.completions.create(
             model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an expert cover letter writer."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_cover_letter_messages(resume_summary, job_details),
             temperature=0.7
         )
 
@@ -75,4 +84,82 @@ def generate_cover_letter(resume_summary: dict, job_details: dict) -> str:
 
     except Exception as e:
         print(f"Error in cover letter generation: {str(e)}", flush=True)
-        return None
\ No newline at end of file
+        return None
+
+async def agenerate_cover_letter(resume_summary: dict, job_details: dict) -> str:
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_cover_letter_messages(resume_summary, job_details),
+            temperature=0.7
+        )
+
+        return response.choices[0].message.content.strip()
+
+    except Exception as e:
+        print(f"Error in cover letter generation: {str(e)}", flush=True)
+        return None
+
+# Streams the letter as it is generated. Errors propagate so the caller can report them.
+async def astream_cover_letter(resume_summary: dict, job_details: dict):
+    stream = await get_async_client().chat.completions.create(
+        model=LLM_MODEL,
+        messages=build_cover_letter_messages(resume_summary, job_details),
+        temperature=0.7,
+        stream=True
+    )
+
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+class RequestRateLimiter:
+    """Spaces out request starts so that at most requests_per_minute begin in any minute."""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+# One budget for every batch, so concurrent requests together stay under the per-minute limit
+cover_letter_rate_limiter = RequestRateLimiter(COVER_LETTER_REQUESTS_PER_MINUTE)
+
+# Generates one letter per job concurrently and yields (index, result) pairs in completion order.
+# result is {"cover_letter": ...} or {"error": ...}; one failed job never fails the batch.
+async def agenerate_cover_letters(resume_summary: dict, jobs: list[dict],
+                                  max_concurrency: int = COVER_LETTER_MAX_CONCURRENCY,
+                                  rate_limiter: RequestRateLimiter = cover_letter_rate_limiter):
+    # The resume part of the prompt is identical for every job, so it is built once
+    formatted_resume = format_resume_summary(resume_summary)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def generate(index: int, job_details: dict):
+        async with semaphore:
+            await rate_limiter.acquire()
+            try:
+                response = await get_async_client().chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=build_cover_letter_messages(resume_summary, job_details, formatted_resume),
+                    temperature=0.7
+                )
+                return index, {"cover_letter": response.choices[0].message.content.strip()}
+            except Exception as e:
+                print(f"Error in cover letter generation: {str(e)}", flush=True)
+                return index, {"error": f"Cover letter generation failed: {str(e)}"}
+
+    tasks = [asyncio.create_task(generate(i, job)) for i, job in enumerate(jobs)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # The client went away: don't keep paying for letters nobody will read
+        for task in tasks:
+            task.cancel()
@@ -1,26 +1,143 @@
 from dotenv import load_dotenv
 import os
-import openai
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from agents.embedding_cache import EmbeddingCache
+from agents.llm_clients import get_client
+from agents.tokenizer import count_tokens
+from agents.vector_quantization import unit_rows
 
-LLM_MODEL = "gpt-3.5-turbo" 
+LLM_MODEL = "gpt-3.5-turbo"
 
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 EMBEDDING_MODEL = "text-embedding-3-small"
+# Ask the API for shorter vectors (e.g. 512 or 256 instead of 1536); 0 keeps the model's full size
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+# Vectors of different sizes never share cache entries
+EMBEDDING_CACHE_MODEL = f"{EMBEDDING_MODEL}@{EMBEDDING_DIMENSIONS}" if EMBEDDING_DIMENSIONS else EMBEDDING_MODEL
 
-# Length of each embedding is 1536 for text-embedding-3-small
-def get_embeddings(arr:list) -> list[list[float]]:
-    
-    response = openai.embeddings.create(
+# Set EMBEDDING_CACHE_ENABLED=0 to always go to the API
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") != "0"
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_MODEL) if EMBEDDING_CACHE_ENABLED else None
+
+# Batching limits. The API allows 2048 inputs and 300k tokens per request;
+# smaller batches keep each round trip short so they can run side by side.
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "100000"))
+EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", "256"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+
+def _embed_with_api(arr: list[str]) -> list[list[float]]:
+    extra = {"dimensions": EMBEDDING_DIMENSIONS} if EMBEDDING_DIMENSIONS else {}
+    response = get_client().embeddings.create(
         input=arr,
-        model=EMBEDDING_MODEL    
+        model=EMBEDDING_MODEL,
+        **extra
     )
-    
-    embeddings = [record.embedding for record in response.data]
-    
+
+    return [record.embedding for record in response.data]
+
+def plan_batches(texts: list[str], max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+                 max_items: int = EMBEDDING_BATCH_MAX_ITEMS) -> list[list[int]]:
+    """
+    Splits texts into batches of indices so that no batch exceeds max_items inputs
+    or max_tokens tokens. A text that is larger than max_tokens on its own gets a batch to itself.
+    """
+    batches = []
+    current, current_tokens = [], 0
+
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+def embed_in_batches(texts: list[str], max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS,
+                     max_items: int = EMBEDDING_BATCH_MAX_ITEMS,
+                     max_concurrency: int = EMBEDDING_MAX_CONCURRENCY) -> tuple[list[list[float]], dict]:
+    """
+    Embeds texts through the API in token/item bounded batches sent concurrently.
+
+    Returns the vectors in the same order as texts, and stats with the batch count
+    and the latency of every batch in seconds.
+    """
+    batches = plan_batches(texts, max_tokens, max_items)
+    embeddings = [None] * len(texts)
+    latencies = [0.0] * len(batches)
+
+    def run_batch(batch_number: int):
+        indices = batches[batch_number]
+        start = time.perf_counter()
+        vectors = _embed_with_api([texts[i] for i in indices])
+        latencies[batch_number] = time.perf_counter() - start
+        for i, vector in zip(indices, vectors):
+            embeddings[i] = vector
+
+    if len(batches) == 1:
+        run_batch(0)
+    elif batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as pool:
+            # list() re-raises the first failed batch
+            list(pool.map(run_batch, range(len(batches))))
+
+    stats = {
+        "batch_count": len(batches),
+        "batch_sizes": [len(batch) for batch in batches],
+        "batch_latencies": latencies,
+    }
+
+    return embeddings, stats
+
+def _unit_matrix(vectors: list[list[float]]) -> np.ndarray:
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32)
+    return unit_rows(np.array(vectors, dtype=np.float32))
+
+def embed_texts(arr, as_matrix: bool = False) -> tuple[list[list[float]], dict]:
+    """
+    get_embeddings plus the cache and batching stats of the call. Vectors are scaled to
+    unit length; with as_matrix they come back as one float32 matrix (a row per text)
+    instead of lists, ready for ranking with normalized=True.
+    """
+    # A single string is embedded as a one-element batch, like the API does
+    texts = [arr] if isinstance(arr, str) else list(arr)
+
+    if embedding_cache is None:
+        embeddings, stats = embed_in_batches(texts)
+        stats["cache_hits"] = 0
+        matrix = _unit_matrix(embeddings)
+        return (matrix if as_matrix else matrix.tolist()), stats
+
+    # Only the texts that are not cached yet are sent to the API
+    cached = embedding_cache.get_many(texts)
+    missing_texts = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+
+    fresh_vectors, stats = embed_in_batches(missing_texts)
+    fresh_matrix = _unit_matrix(fresh_vectors)
+    # Fresh vectors are used as the cache stores them, so a repeat search gives the same scores
+    fresh = dict(zip(missing_texts, embedding_cache.put_many(missing_texts, fresh_matrix)))
+
+    rows = [vector if vector is not None else fresh[text] for text, vector in zip(texts, cached)]
+    matrix = np.empty((len(rows), len(rows[0]) if rows else 0), dtype=np.float32)
+    for i, row in enumerate(rows):
+        matrix[i] = row
+    stats["cache_hits"] = len(texts) - sum(vector is None for vector in cached)
+
+    return (matrix if as_matrix else matrix.tolist()), stats
+
+# Length of each embedding is 1536 for text-embedding-3-small, or EMBEDDING_DIMENSIONS when set
+def get_embeddings(arr:list) -> list[list[float]]:
+    embeddings, _ = embed_texts(arr)
     return embeddings
 
 # res = get_embeddings(["Hello world", "How are you?"])
 
-# print(len(res[0]))
\ No newline at end of file
+# print(len(res[0]))
@@ -0,0 +1,289 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from agents.cache import CACHE_DIR
+from agents.vector_quantization import VECTOR_DTYPES, quantize_rows, dequantize_rows, unit_rows
+
+# Where the on-disk tier lives and how big each tier may grow
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(CACHE_DIR, "embeddings"))
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "4096"))
+EMBEDDING_CACHE_DISK_MB = int(os.getenv("EMBEDDING_CACHE_DISK_MB", "256"))
+# How the disk tier stores vectors: "float32", "float16" (half the space) or "int8" (a quarter, plus a scale per row)
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+# The key index is rewritten once its log holds this many lines (and at least one per disk entry)
+EMBEDDING_CACHE_LOG_MIN_LINES = int(os.getenv("EMBEDDING_CACHE_LOG_MIN_LINES", "1024"))
+
+DISK_FILE_SUFFIXES = {"float32": "f32", "float16": "f16", "int8": "i8"}
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    """Content address of a text for a given embedding model."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embedding vectors keyed by hash(model, text).
+
+    - Memory tier: a small LRU of float32 vectors for the hottest texts.
+    - Disk tier: a memory-mapped matrix (one row per vector, stored as dtype; int8 rows
+      get a float32 scale each in a second memmap) plus a JSON key index mapping each
+      key to its row. When the matrix is full the least recently used row is overwritten.
+      Vectors are stored scaled to unit length and always come back as float32 unit vectors.
+
+    Writes only append "key row" lines to a log next to the JSON index; the index is
+    rewritten (and a fresh log started) when the log outgrows it, and on compact().
+
+    The disk files are written by a single process; run one cache directory per
+    worker if the backend is started with several uvicorn workers.
+    """
+
+    def __init__(self, model: str, cache_dir: str = EMBEDDING_CACHE_DIR,
+                 memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS,
+                 max_disk_mb: int = EMBEDDING_CACHE_DISK_MB, dtype: str = EMBEDDING_CACHE_DTYPE):
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"dtype must be one of {VECTOR_DTYPES}, got {dtype!r}")
+        self.model = model
+        self.dtype = dtype
+        self.cache_dir = os.path.join(cache_dir, model.replace("/", "_"))
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> np.ndarray
+        self._index = OrderedDict()    # key -> row in the memmap, in LRU order
+        self._free_rows = []
+        self._log_generation = 0
+        self._log_lines = 0
+        self._vectors = None           # np.memmap, created once the dimension is known
+        self._scales = None            # np.memmap of per-row scales, int8 only
+        self.dimension = None
+        self.capacity = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._index_path = os.path.join(self.cache_dir, "index.json")
+        self._vectors_path = os.path.join(self.cache_dir, f"vectors.{DISK_FILE_SUFFIXES[dtype]}")
+        self._scales_path = os.path.join(self.cache_dir, "scales.f32")
+        self._load()
+
+    # ------------------------------------------------------------------ disk tier
+
+    def _load(self):
+        if not os.path.exists(self._index_path) or not os.path.exists(self._vectors_path):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            # The index was written for another storage dtype: its rows live in another file
+            if meta.get("dtype", "float32") != self.dtype:
+                return
+            self._open_vectors(meta["dimension"], meta["capacity"])
+            self._index = OrderedDict((key, row) for key, row in meta["entries"])
+            self._log_generation = meta.get("log_generation", 0)
+            self._remove_logs(keep=self._log_path())
+            self._replay_log()
+            used = set(self._index.values())
+            self._free_rows = [row for row in range(self.capacity - 1, -1, -1) if row not in used]
+        except Exception as e:
+            # A corrupt index only costs us the cached vectors, never the request
+            print(f"Discarding unreadable embedding cache at {self.cache_dir}: {e}", flush=True)
+            self._vectors = None
+            self._scales = None
+            self._index = OrderedDict()
+            self._free_rows = []
+            self._log_lines = 0
+            self.dimension = None
+            self.capacity = 0
+
+    def _log_path(self) -> str:
+        return os.path.join(self.cache_dir, f"index.{self._log_generation}.log")
+
+    def _remove_logs(self, keep: str = None):
+        """Deletes logs left behind by a crash mid-rewrite or by another dtype."""
+        for path in glob.glob(os.path.join(self.cache_dir, "index.*.log")):
+            if path != keep:
+                os.remove(path)
+
+    def _replay_log(self):
+        """Applies the rows written since the index was last rewritten."""
+        if not os.path.exists(self._log_path()):
+            return
+        owners = {row: key for key, row in self._index.items()}
+        with open(self._log_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                # A line cut short by a crash ends the log
+                if len(parts) != 2 or not parts[1].isdigit() or not line.endswith("\n"):
+                    break
+                key, row = parts[0], int(parts[1])
+                if row >= self.capacity:
+                    break
+                # The row was reused, so the key it held before is gone
+                previous = owners.get(row)
+                if previous is not None and previous != key:
+                    del self._index[previous]
+                if key in self._index and self._index[key] != row:
+                    owners.pop(self._index[key], None)
+                self._index[key] = row
+                self._index.move_to_end(key)
+                owners[row] = key
+                self._log_lines += 1
+
+    def _open_vectors(self, dimension: int, capacity: int):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        mode = "r+" if os.path.exists(self._vectors_path) else "w+"
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode=mode, shape=(capacity, dimension))
+        if self.dtype == "int8":
+            mode = "r+" if mode == "r+" and os.path.exists(self._scales_path) else "w+"
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode=mode, shape=(capacity,))
+        self.dimension = dimension
+        self.capacity = capacity
+
+    def _ensure_vectors(self, dimension: int):
+        if self._vectors is not None:
+            return
+        row_bytes = dimension * np.dtype(self.dtype).itemsize + (4 if self.dtype == "int8" else 0)
+        capacity = max(1, self.max_disk_bytes // row_bytes)
+        # Rows of every dtype go, so switching EMBEDDING_CACHE_DTYPE leaves no orphaned matrix behind
+        for suffix in DISK_FILE_SUFFIXES.values():
+            path = os.path.join(self.cache_dir, f"vectors.{suffix}")
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.exists(self._scales_path):
+            os.remove(self._scales_path)
+        self._remove_logs()
+        self._open_vectors(dimension, capacity)
+        self._free_rows = list(range(capacity - 1, -1, -1))
+        # An index left by another dtype (and its log) must not be read with these rows
+        self._persist_index()
+
+    def _persist_index(self):
+        """Rewrites the JSON index and starts a new, empty log."""
+        old_log_path = self._log_path()
+        meta = {
+            "model": self.model,
+            "dimension": self.dimension,
+            "dtype": self.dtype,
+            "capacity": self.capacity,
+            "log_generation": self._log_generation + 1,
+            "entries": list(self._index.items()),
+        }
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._index_path)
+        # The new index already holds everything the old log recorded
+        self._log_generation += 1
+        self._log_lines = 0
+        if os.path.exists(old_log_path):
+            os.remove(old_log_path)
+
+    def _append_log(self, entries: list[tuple[str, int]]):
+        with open(self._log_path(), "a", encoding="utf-8") as f:
+            f.write("".join(f"{key} {row}\n" for key, row in entries))
+        self._log_lines += len(entries)
+        if self._log_lines >= max(EMBEDDING_CACHE_LOG_MIN_LINES, len(self._index)):
+            self._persist_index()
+
+    def _read_row(self, row: int) -> np.ndarray:
+        scales = self._scales[row:row + 1] if self._scales is not None else np.ones(1, dtype=np.float32)
+        # Rounding to float16 / int8 moves the length slightly off 1
+        return unit_rows(dequantize_rows(self._vectors[row:row + 1], scales))[0]
+
+    # ----------------------------------------------------------------- public API
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> list:
+        """Returns one float32 vector (or None on a miss) per text."""
+        results = []
+        with self._lock:
+            for text in texts:
+                key = embedding_cache_key(self.model, text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                elif key in self._index:
+                    row = self._index[key]
+                    self._index.move_to_end(key)
+                    vector = self._read_row(row)
+                    self._remember(key, vector)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                results.append(vector)
+        return results
+
+    def put_many(self, texts: list[str], vectors: list) -> list[np.ndarray]:
+        """
+        Stores vectors for texts in both tiers, evicting LRU rows when the disk tier is full.
+        Returns each vector the way a later hit returns it (rounded to dtype), so a text
+        scores the same on the search that embedded it as on every later one.
+        """
+        if not texts:
+            return []
+        stored = []
+        with self._lock:
+            written = []
+            for text, vector in zip(texts, vectors):
+                key = embedding_cache_key(self.model, text)
+                vector = unit_rows(np.array(vector, dtype=np.float32, ndmin=2))[0]
+                codes, scales = quantize_rows(vector, self.dtype)
+                if self.dtype != "float32":
+                    vector = unit_rows(dequantize_rows(codes, scales))[0]
+                self._remember(key, vector)
+                stored.append(vector)
+
+                self._ensure_vectors(vector.shape[0])
+                if vector.shape[0] != self.dimension:
+                    continue
+
+                if key in self._index:
+                    row = self._index[key]
+                    self._index.move_to_end(key)
+                else:
+                    if not self._free_rows:
+                        _, row = self._index.popitem(last=False)
+                    else:
+                        row = self._free_rows.pop()
+                    self._index[key] = row
+                self._vectors[row] = codes[0]
+                if self._scales is not None:
+                    self._scales[row] = scales[0]
+                written.append((key, row))
+
+            if written:
+                # Rows reach the disk before the log points at them
+                self._vectors.flush()
+                if self._scales is not None:
+                    self._scales.flush()
+                self._append_log(written)
+        return stored
+
+    def compact(self):
+        """Folds the log into the JSON index, so the next start has nothing to replay."""
+        with self._lock:
+            if self._vectors is not None and self._log_lines:
+                self._persist_index()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "dtype": self.dtype,
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_items": len(self._memory),
+            "disk_items": len(self._index),
+            "disk_capacity": self.capacity,
+        }
@@ -3,65 +3,90 @@
 # and generates a query for the sending through the jsearch api.
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from agents.llm_clients import get_client, get_async_client
+from agents.conversation_memory import ConversationMemory, MEMORY_RECENT_TURNS
+from agents.cache import CACHE_DIR, SQLiteCache
+import hashlib
+import json
 import os
+import re
 
 LLM_MODEL = "gpt-3.5-turbo" 
+# Bump whenever the prompt or the keyword rules change so memoized queries are recomputed
+QUERY_PROMPT_VERSION = "2"
 
 # Loading the environment variables from the .env file
 load_dotenv()
-client = OpenAI(api_key = os.getenv("OPENAI_API_KEY"))
 
-def generate_query_for_jobsearch(resume_summary: dict, chat_history: list[dict]):
+# Queries are memoized on the resume summary plus the last few chat messages
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", str(24 * 3600)))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "5000"))
+QUERY_CACHE_RECENT_TURNS = int(os.getenv("QUERY_CACHE_RECENT_TURNS", str(MEMORY_RECENT_TURNS)))
+# Set QUERY_FAST_PATH_ENABLED=0 to always ask the LLM when the memo misses
+QUERY_FAST_PATH_ENABLED = os.getenv("QUERY_FAST_PATH_ENABLED", "1") != "0"
+
+query_cache = SQLiteCache(
+    os.path.join(CACHE_DIR, "jsearch_query.sqlite"),
+    ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+    max_entries=QUERY_CACHE_MAX_ENTRIES,
+)
+
+# Builds the messages shared by the sync and async versions of generate_query_for_jobsearch.
+# The history goes through the conversation memory, so older turns arrive summarized.
+def build_query_messages(resume_summary: dict, chat_history: list[dict], memory: ConversationMemory = None) -> list[dict]:
+    # Format the chat history into readable lines
+    memory = memory if memory is not None else ConversationMemory()
+    formatted_chat_history = memory.render(chat_history)
+    
+    summary =   f"""
+    Summary: {resume_summary.get('Summary', 'No summary provided.')}
+    """
+    
+    # Crafting the system and user prompts for the LLM
+    
+    system_prompt = f"""
+    You are a job search assistant. Your task is to generate a concise job search query based on the candidate's resume summary and the given chat history with the user.
+    - Focus on extracting the **desired job role**, **location** (if mentioned), **job level** (e.g., entry level, senior), and **job type** (e.g., AI, ML).
+    - The query should include the job role and the job level/type, such as "entry-level AI jobs" or "internship in AI" or "senior Data Scientist".
+    - If the resume mentions a specific job level (e.g., internship, entry-level, senior), include it.
+    - If no job level is mentioned, generate a generic query like "AI jobs" or "developer jobs".
+    - The query should be simple and clear, with the format "[Job Level] [Job Type] jobs".
+    - Avoid including technical skills or personal details.
+    """
+
+    
+    user_prompt = f"""
+     Resume Summary:
+    {summary}
+    
+    Chat History:
+    {formatted_chat_history}
+
+    ---
+
+    Task:
+    Based on the above resume summary and the most recent chat history conversation also keeping in mind the entire chat history, generate a **short, clear job search query** that includes the **job role**, **job level** (e.g., entry-level, internship), and **job type** (e.g., AI, ML).
+    The query should be in the format:
+    - "[Job Level] [Job Type] jobs"
+    Example queries:
+    - "AI jobs"
+    - "internship in AI"
+    - "senior developer jobs"
+    - "junior data scientist jobs"
+    Ensure that the query reflects the job level/type mentioned in the resume.
+    """.strip()
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def generate_query_for_jobsearch(resume_summary: dict, chat_history: list[dict], memory: ConversationMemory = None):
     try:
-        # Format the chat history into readable lines
-        formatted_chat_history = "\n".join([f"{msg['role'].capitalize()}: {msg['content']}" for msg in chat_history])
-        
-        summary =   f"""
-        Summary: {resume_summary.get('Summary', 'No summary provided.')}
-        """
-        
-        # Crafting the system and user prompts for the LLM
-        
-        system_prompt = f"""
-        You are a job search assistant. Your task is to generate a concise job search query based on the candidate's resume summary and the given chat history with the user.
-        - Focus on extracting the **desired job role**, **location** (if mentioned), **job level** (e.g., entry level, senior), and **job type** (e.g., AI, ML).
-        - The query should include the job role and the job level/type, such as "entry-level AI jobs" or "internship in AI" or "senior Data Scientist".
-        - If the resume mentions a specific job level (e.g., internship, entry-level, senior), include it.
-        - If no job level is mentioned, generate a generic query like "AI jobs" or "developer jobs".
-        - The query should be simple and clear, with the format "[Job Level] [Job Type] jobs".
-        - Avoid including technical skills or personal details.
-        """
-
-        
-        user_prompt = f"""
-         Resume Summary:
-        {summary}
-        
-        Chat History:
-        {formatted_chat_history}
-
-        ---
-
-        Task:
-        Based on the above resume summary and the most recent chat history conversation also keeping in mind the entire chat history, generate a **short, clear job search query** that includes the **job role**, **job level** (e.g., entry-level, internship), and **job type** (e.g., AI, ML).
-        The query should be in the format:
-        - "[Job Level] [Job Type] jobs"
-        Example queries:
-        - "AI jobs"
-        - "internship in AI"
-        - "senior developer jobs"
-        - "junior data scientist jobs"
-        Ensure that the query reflects the job level/type mentioned in the resume.
-        """.strip()
-        
         # Call OpenAI API (using GPT-3.5 or GPT-4)
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model=LLM_MODEL,  # or "gpt-4" for a more powerful model
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=build_query_messages(resume_summary, chat_history, memory),
             temperature=0.3,
         )
                 
@@ -71,4 +96,128 @@ def generate_query_for_jobsearch(resume_summary: dict, chat_history: list[dict])
     
     except Exception as e:
         print(f"Error in extracting query: {e}")
-        return None
\ No newline at end of file
+        return None
+
+# Same as generate_query_for_jobsearch, but awaits the completion instead of blocking the event loop
+async def agenerate_query_for_jobsearch(resume_summary: dict, chat_history: list[dict], memory: ConversationMemory = None):
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_query_messages(resume_summary, chat_history, memory),
+            temperature=0.3,
+        )
+
+        return response.choices[0].message.content.strip()
+
+    except Exception as e:
+        print(f"Error in extracting query: {e}")
+        return None
+
+
+# ------------------------------------------------------- memo and keyword fast path
+
+def query_cache_key(resume_summary: dict, chat_history: list[dict]) -> str:
+    recent_turns = [
+        f"{msg['role']}:{' '.join(msg['content'].lower().split())}"
+        for msg in chat_history[-QUERY_CACHE_RECENT_TURNS:]
+    ] if QUERY_CACHE_RECENT_TURNS > 0 else []
+    payload = json.dumps({"resume": resume_summary, "chat": recent_turns}, sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"query:{digest}:{QUERY_PROMPT_VERSION}:{LLM_MODEL}"
+
+# Query wording -> phrases that signal it, checked in order
+JOB_LEVELS = {
+    "internship": ["internship", "intern", "co-op"],
+    "entry-level": ["entry level", "entry-level", "junior", "graduate", "new grad", "fresher"],
+    "mid-level": ["mid level", "mid-level", "intermediate"],
+    "senior": ["senior", "staff", "principal", "lead"],
+}
+JOB_TYPES = {
+    "machine learning": ["machine learning", "ml engineer", "ml", "deep learning"],
+    "AI": ["artificial intelligence", "ai", "ai/ml", "genai", "generative ai", "llm"],
+    "data scientist": ["data scientist", "data science"],
+    "data engineer": ["data engineer", "data engineering"],
+    "data analyst": ["data analyst", "data analytics", "business analyst"],
+    "frontend developer": ["frontend", "front-end", "front end", "react developer"],
+    "backend developer": ["backend", "back-end", "back end"],
+    "full stack developer": ["full stack", "full-stack", "fullstack"],
+    "mobile developer": ["mobile", "android", "ios developer"],
+    "devops": ["devops", "site reliability", "sre"],
+    "cloud engineer": ["cloud engineer", "cloud engineering"],
+    "cybersecurity": ["cybersecurity", "cyber security", "security engineer"],
+    "product manager": ["product manager", "product management"],
+    "UX designer": ["ux", "ui/ux", "product designer"],
+    "software engineer": ["software engineer", "software developer", "software engineering"],
+}
+# "in Berlin", "near London": location wishes are left to the LLM, which can phrase them
+LOCATION_PATTERN = re.compile(r"\b(?:in|near|around|based in)\s+[A-Z][a-z]+")
+# "not frontend", "no internships", "anything except data": exclusions are left to the LLM too
+NEGATION_PATTERN = re.compile(r"\b(?:not|no|never|nor|except|excluding|without|avoid|instead|rather than)\b|n['’]t\b",
+                              re.IGNORECASE)
+# An employment type ("full-time") says something about the level the keywords can't weigh
+EMPLOYMENT_TYPE_PATTERN = re.compile(r"\b(?:full[- ]?time|part[- ]?time|contract|permanent|freelance)\b", re.IGNORECASE)
+
+def _find_labels(text: str, vocabulary: dict) -> set:
+    padded = f" {' '.join(text.lower().split())} "
+    return {label for label, phrases in vocabulary.items()
+            if any(re.search(rf"(?<![a-z]){re.escape(phrase)}(?![a-z])", padded) for phrase in phrases)}
+
+def keyword_query(chat_history: list[dict]):
+    """
+    Builds a "[Job Level] [Job Type] jobs" query without the LLM. Returns None unless
+    confident: exactly one job type and exactly one level, both in the latest user message
+    that names a job type, and no location wish, exclusion or employment type in it.
+    """
+    user_messages = [msg["content"] for msg in chat_history if msg.get("role") == "user"]
+    recent_messages = user_messages[-max(1, QUERY_CACHE_RECENT_TURNS // 2):]
+
+    job_type, level_source = None, None
+    for message in reversed(recent_messages):
+        types = _find_labels(message, JOB_TYPES)
+        if types:
+            if (len(types) > 1 or LOCATION_PATTERN.search(message) or NEGATION_PATTERN.search(message)
+                    or EMPLOYMENT_TYPE_PATTERN.search(message)):
+                return None
+            job_type, level_source = types.pop(), message
+            break
+    if job_type is None:
+        return None
+
+    # The resume is not asked for the level: what it mentions (a past internship, a senior
+    # title) often isn't what the user is searching for now
+    levels = _find_labels(level_source, JOB_LEVELS)
+    if len(levels) != 1:
+        return None
+    level = levels.pop()
+
+    if level == "internship":
+        return f"{job_type} internship"
+    return f"{level} {job_type} jobs"
+
+def resolve_jobsearch_query(resume_summary: dict, chat_history: list[dict], memory: ConversationMemory = None):
+    """Returns (query, source) with source "cache", "keywords" or "llm"; query is None on failure."""
+    key = query_cache_key(resume_summary, chat_history)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached, "cache"
+
+    query, source = (keyword_query(chat_history) if QUERY_FAST_PATH_ENABLED else None), "keywords"
+    if query is None:
+        query, source = generate_query_for_jobsearch(resume_summary, chat_history, memory), "llm"
+    if query:
+        query_cache.set(key, query)
+    return query, source
+
+# Same as resolve_jobsearch_query, but awaits the LLM fallback and the cache instead of blocking the event loop
+async def aresolve_jobsearch_query(resume_summary: dict, chat_history: list[dict], memory: ConversationMemory = None):
+    key = query_cache_key(resume_summary, chat_history)
+    cached = await query_cache.aget(key)
+    if cached is not None:
+        return cached, "cache"
+
+    query, source = (keyword_query(chat_history) if QUERY_FAST_PATH_ENABLED else None), "keywords"
+    if query is None:
+        query, source = await agenerate_query_for_jobsearch(resume_summary, chat_history, memory), "llm"
+    if query:
+        await query_cache.aset(key, query)
+    return query, source
@@ -1,37 +1,206 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 import requests
 from dotenv import load_dotenv
-import os
+from requests.adapters import HTTPAdapter
+
+from agents.cache import CACHE_DIR, SQLiteCache
 
 load_dotenv()
 api_key = os.getenv("RAPID_API_KEY")
 
-def get_jobs(query: str, country: str) -> None:
-
-    url = "https://jsearch.p.rapidapi.com/search"
-
-    querystring = {
-        "query": query,
-        "page": "1",
-        "num_pages": "1",    # 2 pages -> approx 20 jobs
-        "country": country,     # Optional; remove if global
-        "date_posted": "all" # Optional filtering
-    }
-
-    headers = {
-        "x-rapidapi-key": api_key,
-        "x-rapidapi-host": "jsearch.p.rapidapi.com"
-    }
-
-    response = requests.get(url, headers=headers, params=querystring)
-
-    if response.status_code == 200:
-        job_results = response.json()
-        # for job in job_results["data"]:
-        #     print(f"Title: {job['job_title']}")
-        #     print(f"Company: {job['employer_name']}")
-        #     print(f"Location: {job['job_city']}, {job['job_country']}")
-        #     print(f"Link: {job['job_apply_link']}\n")
-    else:
-        print(f"Error: {response.status_code} - {response.text}")
-        
-    return job_results
\ No newline at end of file
+JSEARCH_URL = "https://jsearch.p.rapidapi.com/search"
+JSEARCH_HOST = "jsearch.p.rapidapi.com"
+
+# Each JSearch page is ~10 jobs. Pages are fetched (and cached) one by one, side by side.
+JSEARCH_NUM_PAGES = int(os.getenv("JSEARCH_NUM_PAGES", "1"))
+JSEARCH_MAX_CONCURRENCY = int(os.getenv("JSEARCH_MAX_CONCURRENCY", "3"))
+JSEARCH_CACHE_TTL_SECONDS = int(os.getenv("JSEARCH_CACHE_TTL_SECONDS", str(6 * 3600)))
+JSEARCH_CACHE_MAX_ENTRIES = int(os.getenv("JSEARCH_CACHE_MAX_ENTRIES", "2000"))
+# Retries for rate-limited (429) and 5xx responses, with exponential backoff
+JSEARCH_MAX_RETRIES = int(os.getenv("JSEARCH_MAX_RETRIES", "3"))
+JSEARCH_BACKOFF_SECONDS = float(os.getenv("JSEARCH_BACKOFF_SECONDS", "1.0"))
+JSEARCH_TIMEOUT_SECONDS = float(os.getenv("JSEARCH_TIMEOUT_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class JSearchClient:
+    """
+    Client for the JSearch API with pooled connections, a TTL cache per
+    (query, country, page, date_posted) and concurrent multi-page fetching.
+    """
+
+    def __init__(self, rapid_api_key: str, cache: SQLiteCache = None,
+                 max_concurrency: int = JSEARCH_MAX_CONCURRENCY,
+                 max_retries: int = JSEARCH_MAX_RETRIES,
+                 backoff_seconds: float = JSEARCH_BACKOFF_SECONDS,
+                 timeout: float = JSEARCH_TIMEOUT_SECONDS):
+        self.headers = {
+            "x-rapidapi-key": rapid_api_key or "",
+            "x-rapidapi-host": JSEARCH_HOST
+        }
+        self.cache = cache
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+
+        # Keep-alive connections shared by every sync call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+
+        # Created on first use so it binds to the running event loop
+        self._async_client = None
+
+    @staticmethod
+    def cache_key(query: str, country: str, page: int, date_posted: str) -> str:
+        normalized_query = " ".join((query or "").lower().split())
+        return f"jsearch:{normalized_query}:{country}:{page}:{date_posted}"
+
+    @staticmethod
+    def build_params(query: str, country: str, page: int, date_posted: str) -> dict:
+        params = {
+            "query": query,
+            "page": str(page),
+            "num_pages": "1",
+            "date_posted": date_posted
+        }
+        if country:
+            params["country"] = country
+        return params
+
+    def _retry_delay(self, response, attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_seconds * (2 ** attempt)
+
+    # ------------------------------------------------------------------ sync API
+
+    def fetch_page(self, query: str, country: str, page: int = 1, date_posted: str = "all") -> list[dict]:
+        """Returns the jobs on one result page, or an empty list if the page can't be fetched."""
+        key = self.cache_key(query, country, page, date_posted)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        params = self.build_params(query, country, page, date_posted)
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self.session.get(JSEARCH_URL, headers=self.headers, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"Error: JSearch request failed - {e}", flush=True)
+
+            if response is not None and response.status_code == 200:
+                jobs = response.json().get("data", [])
+                if self.cache is not None:
+                    self.cache.set(key, jobs)
+                return jobs
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                print(f"Error: {response.status_code} - {response.text}", flush=True)
+                return []
+            if attempt < self.max_retries:
+                time.sleep(self._retry_delay(response, attempt))
+
+        print(f"Error: JSearch page {page} for '{query}' failed after {self.max_retries + 1} attempts", flush=True)
+        return []
+
+    def search(self, query: str, country: str, num_pages: int = JSEARCH_NUM_PAGES, date_posted: str = "all") -> dict:
+        pages = list(range(1, max(1, num_pages) + 1))
+        if len(pages) == 1:
+            results = [self.fetch_page(query, country, 1, date_posted)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(pages))) as pool:
+                results = list(pool.map(lambda page: self.fetch_page(query, country, page, date_posted), pages))
+        return {"data": merge_pages(results)}
+
+    # ----------------------------------------------------------------- async API
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            )
+        return self._async_client
+
+    async def afetch_page(self, query: str, country: str, page: int = 1, date_posted: str = "all") -> list[dict]:
+        """Async version of fetch_page."""
+        key = self.cache_key(query, country, page, date_posted)
+        if self.cache is not None:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                return cached
+
+        params = self.build_params(query, country, page, date_posted)
+        client = self._get_async_client()
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await client.get(JSEARCH_URL, headers=self.headers, params=params)
+            except httpx.HTTPError as e:
+                print(f"Error: JSearch request failed - {e}", flush=True)
+
+            if response is not None and response.status_code == 200:
+                jobs = response.json().get("data", [])
+                if self.cache is not None:
+                    await self.cache.aset(key, jobs)
+                return jobs
+
+            if response is not None and response.status_code not in RETRYABLE_STATUS_CODES:
+                print(f"Error: {response.status_code} - {response.text}", flush=True)
+                return []
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._retry_delay(response, attempt))
+
+        print(f"Error: JSearch page {page} for '{query}' failed after {self.max_retries + 1} attempts", flush=True)
+        return []
+
+    async def asearch(self, query: str, country: str, num_pages: int = JSEARCH_NUM_PAGES, date_posted: str = "all") -> dict:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(page: int):
+            async with semaphore:
+                return await self.afetch_page(query, country, page, date_posted)
+
+        results = await asyncio.gather(*(fetch(page) for page in range(1, max(1, num_pages) + 1)))
+        return {"data": merge_pages(results)}
+
+# Concatenates result pages, dropping jobs that show up on more than one page
+def merge_pages(pages: list[list[dict]]) -> list[dict]:
+    jobs, seen_ids = [], set()
+    for page in pages:
+        for job in page:
+            job_id = job.get("job_id")
+            if job_id is not None:
+                if job_id in seen_ids:
+                    continue
+                seen_ids.add(job_id)
+            jobs.append(job)
+    return jobs
+
+
+jsearch_client = JSearchClient(
+    api_key,
+    cache=SQLiteCache(
+        os.path.join(CACHE_DIR, "jsearch.sqlite"),
+        ttl_seconds=JSEARCH_CACHE_TTL_SECONDS,
+        max_entries=JSEARCH_CACHE_MAX_ENTRIES,
+    ),
+)
+
+def get_jobs(query: str, country: str, num_pages: int = JSEARCH_NUM_PAGES, date_posted: str = "all") -> dict:
+    return jsearch_client.search(query, country, num_pages, date_posted)
+
+# Same as get_jobs, but awaits the HTTP calls instead of blocking the event loop
+async def aget_jobs(query: str, country: str, num_pages: int = JSEARCH_NUM_PAGES, date_posted: str = "all") -> dict:
+    return await jsearch_client.asearch(query, country, num_pages, date_posted)
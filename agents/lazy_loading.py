@@ -0,0 +1,57 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Heavy dependencies (spaCy, faiss, the OpenAI SDK, ...) are loaded on first use rather
+# than at import, so the backend starts quickly after a cold start. Every import or load
+# is timed here so the startup cost can be broken down per module.
+
+load_timings = {}  # name -> {"seconds": float, "phase": "import" | "lazy"}
+_timings_lock = threading.Lock()
+
+
+@contextmanager
+def timed_load(name: str, phase: str = "lazy"):
+    """Records how long the body takes under name, e.g. around an import statement."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _timings_lock:
+            load_timings[name] = {"seconds": round(elapsed, 4), "phase": phase}
+
+
+def load_once(name: str):
+    """
+    Decorator for a zero-argument loader: the first call runs it (timed under name),
+    later calls return the same object. Concurrent first calls wait for one load.
+    """
+    def decorator(load):
+        lock = threading.Lock()
+        loaded = []
+
+        @functools.wraps(load)
+        def wrapper():
+            if not loaded:
+                with lock:
+                    if not loaded:
+                        with timed_load(name):
+                            loaded.append(load())
+            return loaded[0]
+
+        wrapper.is_loaded = lambda: bool(loaded)
+        return wrapper
+    return decorator
+
+
+def load_report() -> dict:
+    """Per-module load cost, slowest first."""
+    with _timings_lock:
+        timings = dict(load_timings)
+    ordered = sorted(timings.items(), key=lambda item: item[1]["seconds"], reverse=True)
+    return {
+        "total_seconds": round(sum(entry["seconds"] for _, entry in ordered), 4),
+        "modules": [{"name": name, **entry} for name, entry in ordered],
+    }
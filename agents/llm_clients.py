@@ -0,0 +1,22 @@
+import os
+
+from dotenv import load_dotenv
+
+from agents.lazy_loading import load_once
+
+# One sync and one async OpenAI client shared by every agent. Both are created on first
+# use, so importing an agent doesn't pay for importing the OpenAI SDK.
+
+load_dotenv()
+
+
+@load_once("openai.client")
+def get_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+@load_once("openai.async_client")
+def get_async_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -1,17 +1,21 @@
 import re
-import spacy
 import requests
 import json
 from dotenv import load_dotenv
 import os
-from openai import OpenAI
+from agents.llm_clients import get_client, get_async_client
+from agents.lazy_loading import load_once
 
 LLM_MODEL = "gpt-3.5-turbo" 
 
+# Bump these whenever the parsing rules or the prompts change so cached parses are invalidated
+TRADITIONAL_PARSER_VERSION = "4"
+LLM_PARSER_VERSION = "1"
+STRUCTURED_PARSER_VERSION = "1"
+
 # llm_api_url = f"https://api-inference.huggingface.co/models/{LLM_MODEL}"
 
 load_dotenv()
-client = OpenAI(api_key = os.getenv("OPENAI_API_KEY"))
 # headers = {
 #     "Authorization": f"Bearer {hf_api_key}",
 #     "Content-Type": "application/json"
@@ -19,8 +23,34 @@ client = OpenAI(api_key = os.getenv("OPENAI_API_KEY"))
 
 
 
-# Load the English NLP model from spaCy
-nlp = spacy.load("en_core_web_sm")
+# The parser only needs named entities, so every other pipeline component is left out
+# (en_core_web_sm's NER has its own embedding layer and doesn't need the shared tok2vec)
+SPACY_EXCLUDED_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+# NER only looks for the candidate's name, which sits at the top of the resume
+NER_HEADER_LINES = int(os.getenv("NER_HEADER_LINES", "15"))
+NER_HEADER_MAX_CHARS = int(os.getenv("NER_HEADER_MAX_CHARS", "1000"))
+
+# Load the English NLP model from spaCy on first use; it takes a second or more
+@load_once("spacy.en_core_web_sm")
+def get_nlp():
+    import spacy
+    return spacy.load("en_core_web_sm", exclude=SPACY_EXCLUDED_COMPONENTS)
+
+# The first few non-empty lines of the resume, where the name is expected
+def resume_header(text: str) -> str:
+    lines = [line for line in text.strip().split("\n") if line.strip()]
+    return "\n".join(lines[:NER_HEADER_LINES])[:NER_HEADER_MAX_CHARS]
+
+# Name from the top line if it is short enough to be one, else None
+def name_from_first_line(text: str):
+    lines = text.strip().split("\n")
+    return lines[0].strip() if lines and len(lines[0].strip().split()) <= 4 else None
+
+def name_from_entities(doc):
+    for ent in list(doc.ents)[:5]:
+        if ent.label_ == "PERSON":
+            return ent.text
+    return None
 
 def extract_section(text: str, section_keywords: list, next_section_keywords: list) -> list:
     """
@@ -34,34 +64,97 @@ def extract_section(text: str, section_keywords: list, next_section_keywords: li
         return lines
     return []
 
-def traditional_resume_parser(text: str, country: str) -> dict:
-    doc = nlp(text)
+# Section name -> headings that start it, longest first so "work experience" wins over "experience"
+SECTION_HEADINGS = {
+    "education": ["academic background", "education"],
+    "experience": ["work experience", "employment history", "work history", "experience"],
+    "skills": ["technical skills", "skills"],
+    "projects": ["projects"],
+    "internships": ["internships"],
+    "certifications": ["certifications"],
+    "achievements": ["achievements", "accomplishments"],
+}
+HEADING_TO_SECTION = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
 
-    # Extract name from top line or first PERSON entity
-    lines = text.strip().split("\n")
-    name = lines[0].strip() if lines and len(lines[0].strip().split()) <= 4 else None
-    if not name:
-        for ent in list(doc.ents)[:5]:
-            if ent.label_ == "PERSON":
-                name = ent.text
+# Words that often come before a heading ("PROFESSIONAL EXPERIENCE", "Academic Projects")
+HEADING_QUALIFIERS = ["professional", "academic", "personal", "relevant", "key", "selected", "technical",
+                      "core", "research", "industry", "additional", "other", "notable", "major"]
+
+# A heading starts a line (after optional bullets and one qualifier word), may go on with
+# "& ..." / "and ..." ("Education & Certifications", "Technical Skills & Tools"), and is
+# followed by ':' / '-' or the end of the line. After a bullet the heading must be all the
+# line holds, so an inline label inside a section ("- Skills: Python, Go") isn't a heading.
+HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?P<bullet>[•●\-][ \t•●\-]*)?(?:(?:" + "|".join(HEADING_QUALIFIERS) + r")[ \t]+)?(?P<heading>"
+    + "|".join(re.escape(heading) for heading in sorted(HEADING_TO_SECTION, key=len, reverse=True))
+    + r")(?:[ \t]+(?:&|and)[ \t]+[a-z][a-z/,& \t]{0,40}?)?[ \t]*"
+    + r"(?(bullet)[:\-]?[ \t]*$|(?:[:\-][ \t]*|$))",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+def section_lines(section_text: str) -> list:
+    return [line.strip("•●- \t") for line in section_text.split("\n") if line.strip()]
+
+def segment_resume(text: str) -> tuple[list, dict]:
+    """
+    Splits the resume at its section headings in a single pass.
+    Returns (summary lines before the first heading, {section: lines}). Every section
+    in SECTION_HEADINGS is present; when a heading repeats, the first one wins.
+    """
+    sections = {section: [] for section in SECTION_HEADINGS}
+    summary = None
+    seen = set()
+    current = None  # (section, start of its content) until the next heading closes it
+    for match in HEADING_PATTERN.finditer(text):
+        if summary is None:
+            summary = section_lines(text[:match.start()])
+        if current is not None:
+            sections[current[0]] = section_lines(text[current[1]:match.start()])
+            current = None
+            # Every section has been read, so nothing further down can change the result
+            if len(seen) == len(sections):
                 break
+        section = HEADING_TO_SECTION[match.group("heading").lower()]
+        if section not in seen:
+            seen.add(section)
+            current = (section, match.end())
+    if current is not None:
+        sections[current[0]] = section_lines(text[current[1]:])
+    return summary or [], sections
+
+def traditional_resume_parser(text: str, country: str) -> dict:
+    # Extract name from top line or first PERSON entity in the header.
+    # spaCy only runs when the top line doesn't look like a name.
+    name = name_from_first_line(text)
+    if not name:
+        name = name_from_entities(get_nlp()(resume_header(text)))
+
+    return parse_resume_sections(text, country, name)
 
+def traditional_resume_parser_batch(texts: list[str], countries: list[str], batch_size: int = 32,
+                                    n_process: int = 1) -> list[dict]:
+    """
+    Parses many resumes at once. Headers that need NER go through nlp.pipe in batches,
+    spread over n_process worker processes when n_process > 1.
+    """
+    names = [name_from_first_line(text) for text in texts]
+    needs_ner = [i for i, name in enumerate(names) if not name]
+    if needs_ner:
+        headers = (resume_header(texts[i]) for i in needs_ner)
+        docs = get_nlp().pipe(headers, batch_size=batch_size, n_process=n_process)
+        for i, doc in zip(needs_ner, docs):
+            names[i] = name_from_entities(doc)
+
+    return [parse_resume_sections(text, country, name) for text, country, name in zip(texts, countries, names)]
+
+# Regex-based extraction of everything but the name
+def parse_resume_sections(text: str, country: str, name) -> dict:
     # Extract email and phone
     email = re.search(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", text)
     phone = re.findall(r"\+?\d[\d\s\-]{7,}", text)
 
-    # Extract sections flexibly
-    education = extract_section(text, ["education", "academic background"], ["experience", "skills", "projects", "certifications"])
-    experience = extract_section(text, ["experience", "work experience"], ["skills", "projects", "education", "certifications"])
-    skills = extract_section(text, ["skills", "technical skills"], ["experience", "projects", "education", "certifications"])
-    projects = extract_section(text, ["projects"], ["experience", "education", "certifications"])
-    internships = extract_section(text, ["internships"], ["experience", "education", "projects"])
-    certifications = extract_section(text, ["certifications"], ["experience", "education", "projects"])
-    achievements = extract_section(text, ["achievements", "accomplishments"], ["experience", "education", "projects"])
-
-    # Extract summary (usually the paragraph before first section)
-    summary_match = re.search(r"(?s)(.*?)(?=\n(?:education|experience|skills|projects|internships|certifications|achievements)\b)", text, re.IGNORECASE)
-    summary = [line.strip() for line in summary_match.group(1).strip().split("\n") if line.strip()] if summary_match else []
+    # Split into sections at the headings; the summary is whatever comes before the first one
+    summary, sections = segment_resume(text)
 
     return {
         "name": name,
@@ -69,91 +162,111 @@ def traditional_resume_parser(text: str, country: str) -> dict:
         "phone": phone[0] if phone else None,
         "country": country,
         "summary": summary,
-        "education": education,
-        "experience": experience,
-        "skills": skills,
-        "projects": projects,
-        "internships": internships,
-        "certifications": certifications,
-        "achievements": achievements
+        "education": sections["education"],
+        "experience": sections["experience"],
+        "skills": sections["skills"],
+        "projects": sections["projects"],
+        "internships": sections["internships"],
+        "certifications": sections["certifications"],
+        "achievements": sections["achievements"]
     }
 
+def build_llm_parser_messages(text: str, country: str) -> list[dict]:
+    system_prompt = (
+        "You are an intelligent resume parser assistant. Your task is to extract structured information "
+        "from raw resume text and present it in clean, readable format. Just return the result in the form of a dict with clear labels. "
+        "The output format should be like:\n"
+        "Name: ...\n"
+        "Email: ...\n"
+        "Phone: ...\n"
+        "job_country: ...\n"
+        "Summary: ...\n"
+        "Education:\n  - Entry 1\n  - Entry 2\n"
+        "Skills:\n  - Skill 1\n  - Skill 2\n"
+        "Internships:\n  - Internship 1\n"
+        "Work Experience:\n  - Job 1\n"
+        "Projects:\n  - Project 1\n"
+        "Certifications:\n  - Cert 1\n"
+        "Achievements:\n  - Achievement 1\n"
+        "Return as much info as you can. If a field is missing, just leave it blank or mention 'None'.\n\n"
+        f"User-provided country where they want to apply for a job: {country}\n\n"
+        f"Resume Text:\n{text}"
+    )
+
+    return [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": system_prompt}
+    ]
+
+def load_llm_parser_output(content, country: str) -> dict:
+    # print("🔍 Raw LLM Output:\n", content, flush=True)
+
+    parsed_json = json.loads(content) if isinstance(content, str) else content
+
+    if "job_country" not in parsed_json:
+        parsed_json["job_country"] = country
+
+    return parsed_json
+
 def llm_resume_parser(text: str, country: str) -> dict:
     try:
-        system_prompt = (
-            "You are an intelligent resume parser assistant. Your task is to extract structured information "
-            "from raw resume text and present it in clean, readable format. Just return the result in the form of a dict with clear labels. "
-            "The output format should be like:\n"
-            "Name: ...\n"
-            "Email: ...\n"
-            "Phone: ...\n"
-            "job_country: ...\n"
-            "Summary: ...\n"
-            "Education:\n  - Entry 1\n  - Entry 2\n"
-            "Skills:\n  - Skill 1\n  - Skill 2\n"
-            "Internships:\n  - Internship 1\n"
-            "Work Experience:\n  - Job 1\n"
-            "Projects:\n  - Project 1\n"
-            "Certifications:\n  - Cert 1\n"
-            "Achievements:\n  - Achievement 1\n"
-            "Return as much info as you can. If a field is missing, just leave it blank or mention 'None'.\n\n"
-            f"User-provided country where they want to apply for a job: {country}\n\n"
-            f"Resume Text:\n{text}"
-        )
-
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model=LLM_MODEL,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": system_prompt}
-            ],
+            messages=build_llm_parser_messages(text, country),
             temperature=0.2
         )
 
-        content = response.choices[0].message.content
-        # print("🔍 Raw LLM Output:\n", content, flush=True)
+        return load_llm_parser_output(response.choices[0].message.content, country)
 
-        parsed_json = json.loads(content) if isinstance(content, str) else content
+    except Exception as e:
+        return {"error": f"Failed to call OpenAI or parse response: {str(e)}"}
 
-        if "job_country" not in parsed_json:
-            parsed_json["job_country"] = country
+async def allm_resume_parser(text: str, country: str) -> dict:
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_llm_parser_messages(text, country),
+            temperature=0.2
+        )
 
-        return parsed_json
+        return load_llm_parser_output(response.choices[0].message.content, country)
 
     except Exception as e:
         return {"error": f"Failed to call OpenAI or parse response: {str(e)}"}
     
 
+def build_reconcile_messages(traditional_data: dict, llm_data: dict) -> list[dict]:
+    prompt = (
+        "You are an intelligent resume reconciliation assistant. Your task is to merge the resume information "
+        "from a traditional parser and an LLM-based parser.\n"
+        "Return only a dictionary with the following keys:\n"
+        "- Name\n"
+        "- Summary\n"
+        "- Projects\n"
+        "- Country\n\n"
+        "The Summary key should contain comprehensive, detailed professional description that combines the candidate’s background, skills, projects, and experience along with achievements(optional)."
+        "Use rich, descriptive language suitable for semantic search or retrieval. Include relevant keywords from both parsed resumes."
+        "Also include coursework, courses that the candidate has completed or taken, and any other relevant information that can be used to enhance the summary."
+        "in a way suitable for semantic search or vector-based retrieval. "
+        "The Summary should be atleast 300 words in length.\n\n"
+        "Summary should also contain the Country specified  by the user where they would like to apply for a job.\n\n"
+        "Use the best available and unique data respectively from both sources.\n\n"
+        f"Traditional Parsed Resume:\n{json.dumps(traditional_data, indent=2)}\n\n"
+        f"LLM Parsed Resume:\n{json.dumps(llm_data, indent=2)}\n\n"
+        "Reconciled Final Output:"
+    )
+
+    return [
+        {"role": "system", "content": "You are a resume reconciliation assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
 def reconcile_parsed_outputs(traditional_data: dict, llm_data: dict) -> dict:
     try:
-        prompt = (
-            "You are an intelligent resume reconciliation assistant. Your task is to merge the resume information "
-            "from a traditional parser and an LLM-based parser.\n"
-            "Return only a dictionary with the following keys:\n"
-            "- Name\n"
-            "- Summary\n"
-            "- Projects\n"
-            "- Country\n\n"
-            "The Summary key should contain comprehensive, detailed professional description that combines the candidate’s background, skills, projects, and experience along with achievements(optional)."
-            "Use rich, descriptive language suitable for semantic search or retrieval. Include relevant keywords from both parsed resumes."
-            "Also include coursework, courses that the candidate has completed or taken, and any other relevant information that can be used to enhance the summary."
-            "in a way suitable for semantic search or vector-based retrieval. "
-            "The Summary should be atleast 300 words in length.\n\n"
-            "Summary should also contain the Country specified  by the user where they would like to apply for a job.\n\n"
-            "Use the best available and unique data respectively from both sources.\n\n"
-            f"Traditional Parsed Resume:\n{json.dumps(traditional_data, indent=2)}\n\n"
-            f"LLM Parsed Resume:\n{json.dumps(llm_data, indent=2)}\n\n"
-            "Reconciled Final Output:"
-        )
-
-    
         # Call OpenAI API (using GPT-3.5 or GPT-4)
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model=LLM_MODEL,  # or "gpt-4" for a more powerful model
-            messages=[
-                {"role": "system", "content": "You are a resume reconciliation assistant."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_reconcile_messages(traditional_data, llm_data),
             temperature=0.3,
         )
         
@@ -170,3 +283,101 @@ def reconcile_parsed_outputs(traditional_data: dict, llm_data: dict) -> dict:
 
     except Exception as e:
         return {"error": f"Failed to call OpenAI API or parse response: {str(e)}"}
+
+async def areconcile_parsed_outputs(traditional_data: dict, llm_data: dict) -> dict:
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_reconcile_messages(traditional_data, llm_data),
+            temperature=0.3,
+        )
+
+        generated_text = response.choices[0].message.content
+
+        return json.loads(generated_text) if isinstance(generated_text, str) else generated_text
+
+    except Exception as e:
+        return {"error": f"Failed to call OpenAI API or parse response: {str(e)}"}
+
+
+# ------------------------------------------------------------------ fast mode
+# One function-calling request turns the resume text plus the traditional parse straight
+# into the final Name/Summary/Projects/Country dict. The arguments come back as JSON
+# matching the schema, so there is no free-form output to parse.
+
+RESUME_SUMMARY_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "save_resume_summary",
+        "description": "Saves the candidate's resume summary for semantic job search.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "Name": {"type": "string", "description": "The candidate's full name"},
+                "Summary": {
+                    "type": "string",
+                    "description": "Detailed professional description of at least 300 words: background, skills, "
+                                   "projects, experience, coursework and achievements, rich in keywords for "
+                                   "semantic search, and mentioning the country where they want to work.",
+                },
+                "Projects": {"type": "array", "items": {"type": "string"}, "description": "One entry per project"},
+                "Country": {"type": "string", "description": "Country where the candidate wants to apply for jobs"},
+            },
+            "required": ["Name", "Summary", "Projects", "Country"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def build_structured_parser_messages(text: str, traditional_data: dict, country: str) -> list[dict]:
+    prompt = (
+        "Summarize the resume below by calling save_resume_summary.\n"
+        "A rule-based parser has already extracted the sections; use them as hints, and prefer the resume "
+        "text where they disagree or are incomplete.\n\n"
+        f"User-provided country where they want to apply for a job: {country}\n\n"
+        f"Rule-based Parse:\n{json.dumps(traditional_data, indent=2)}\n\n"
+        f"Resume Text:\n{text}"
+    )
+
+    return [
+        {"role": "system", "content": "You are an intelligent resume parser assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+def load_structured_parser_output(response, country: str) -> dict:
+    tool_calls = response.choices[0].message.tool_calls
+    if not tool_calls:
+        raise ValueError("The model did not call save_resume_summary")
+    parsed = json.loads(tool_calls[0].function.arguments)
+    parsed.setdefault("Country", country)
+    return parsed
+
+def structured_resume_parser(text: str, traditional_data: dict, country: str) -> dict:
+    try:
+        response = get_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_structured_parser_messages(text, traditional_data, country),
+            tools=[RESUME_SUMMARY_TOOL],
+            tool_choice={"type": "function", "function": {"name": "save_resume_summary"}},
+            temperature=0.3,
+        )
+
+        return load_structured_parser_output(response, country)
+
+    except Exception as e:
+        return {"error": f"Failed to call OpenAI or parse response: {str(e)}"}
+
+async def astructured_resume_parser(text: str, traditional_data: dict, country: str) -> dict:
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=build_structured_parser_messages(text, traditional_data, country),
+            tools=[RESUME_SUMMARY_TOOL],
+            tool_choice={"type": "function", "function": {"name": "save_resume_summary"}},
+            temperature=0.3,
+        )
+
+        return load_structured_parser_output(response, country)
+
+    except Exception as e:
+        return {"error": f"Failed to call OpenAI or parse response: {str(e)}"}
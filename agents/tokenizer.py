@@ -0,0 +1,39 @@
+from functools import lru_cache
+
+# text-embedding-3-* and gpt-3.5/4 models all use the cl100k_base encoding
+DEFAULT_ENCODING = "cl100k_base"
+
+@lru_cache(maxsize=None)
+def _get_encoding(encoding_name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding_name)
+    except Exception:
+        # tiktoken missing or its BPE file can't be downloaded: fall back to an estimate
+        return None
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """Number of tokens in text, estimated at ~4 characters per token when tiktoken is unavailable."""
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING) -> str:
+    """The longest prefix of text that fits in max_tokens tokens."""
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def split_into_token_chunks(text: str, chunk_tokens: int, encoding_name: str = DEFAULT_ENCODING) -> list[str]:
+    """Splits text into consecutive pieces of at most chunk_tokens tokens."""
+    encoding = _get_encoding(encoding_name)
+    if encoding is None:
+        step = chunk_tokens * 4
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + chunk_tokens]) for i in range(0, len(tokens), chunk_tokens)]
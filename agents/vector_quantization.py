@@ -0,0 +1,45 @@
+import numpy as np
+
+# Compact storage for embedding vectors.
+# "float16" halves the size; "int8" quarters it with one float32 scale per row
+# (symmetric: code = round(value / scale), scale = max |value| / 127).
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+
+def quantize_rows(vectors, dtype: str) -> tuple[np.ndarray, np.ndarray]:
+    """Returns (codes, per-row scales); scales are all 1 unless dtype is int8."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    scales = np.ones(matrix.shape[0], dtype=np.float32)
+    if dtype == "float16":
+        return matrix.astype(np.float16), scales
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return matrix, scales
+
+
+def unit_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scales every row of a float32 matrix to unit length, in place, and returns it."""
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    norms[norms == 0] = 1.0
+    matrix /= norms[:, None]
+    return matrix
+
+
+def dequantize_rows(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    return np.asarray(codes, dtype=np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+
+
+def quantized_scores(query, codes: np.ndarray, scales: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+    """
+    query @ dequantize_rows(codes, scales).T without materializing the float32 matrix:
+    codes are widened one block of rows at a time and the row scales applied to the scores.
+    """
+    query = np.array(query, dtype=np.float32, ndmin=2)
+    scores = np.empty((query.shape[0], codes.shape[0]), dtype=np.float32)
+    for start in range(0, codes.shape[0], block_rows):
+        block = np.asarray(codes[start:start + block_rows], dtype=np.float32)
+        scores[:, start:start + block_rows] = (query @ block.T) * scales[start:start + block_rows]
+    return scores
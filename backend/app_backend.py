@@ -1,18 +1,46 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Response, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 from dotenv import load_dotenv
-from agents.resume_parser import traditional_resume_parser, llm_resume_parser, reconcile_parsed_outputs
-from agents.chatbot import get_llm_response
-from agents.extract_query import generate_query_for_jobsearch
-from agents.job_search import get_jobs
-from agents.embed import get_embeddings
-from vectorDB import VectorDatabase
+from agents.lazy_loading import timed_load, load_once, load_report
+# Each import is timed for the startup report; heavy dependencies (spaCy, faiss, the
+# OpenAI SDK, PDF/DOCX readers) are only loaded on first use or by /warmup
+with timed_load("agents.resume_parser", phase="import"):
+    from agents.resume_parser import get_nlp
+with timed_load("agents.chatbot", phase="import"):
+    from agents.chatbot import aget_llm_response, astream_llm_response
+with timed_load("agents.extract_query", phase="import"):
+    from agents.extract_query import aresolve_jobsearch_query
+with timed_load("agents.job_search", phase="import"):
+    from agents.job_search import aget_jobs
+from agents.llm_clients import get_client, get_async_client
+from agents.conversation_memory import ConversationMemory
+with timed_load("vectorDB", phase="import"):
+    from vectorDB import VectorDatabase, get_faiss, stable_job_id
+from structured_log import log_event
+with timed_load("session_store", phase="import"):
+    from session_store import session_store, new_session
+from text_extraction import UnsupportedFileType, TooManyDocuments, expand_uploads, get_fitz, get_docx2txt
+with timed_load("resume_ingest", phase="import"):
+    from resume_ingest import (aparse_resume_document, aingest_resumes, BULK_PARSER_WORKERS,
+                               BULK_LLM_MAX_CONCURRENCY, BULK_MAX_FILES, RESUME_PARSE_MODES, RESUME_PARSE_MODE)
 import os
-import fitz
-import docx2txt
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import time
+import logging
+import asyncio
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+with timed_load("numpy", phase="import"):
+    import numpy as np
+from ranking import normalize_rows, rank_top_k, recall_at_k
+from lexical_index import BM25Index
+from job_dedup import JobFingerprintIndex
+from job_text import build_job_text, embed_jobs
+from candidate_vector import candidate_vector, resume_profile_text
 
 
 # ------------------------------ Initializing Global Variables for easy access ------------------------------------------
@@ -42,8 +70,89 @@ openai_headers = {
 
 app = FastAPI()
 
-# Global vector database instance
-vector_db = VectorDatabase()
+# Pool for the CPU-bound spaCy resume parser. "process" sidesteps the GIL under load
+# at the cost of loading the spaCy model once per worker process.
+RESUME_PARSER_POOL = os.getenv("RESUME_PARSER_POOL", "thread")
+RESUME_PARSER_WORKERS = int(os.getenv("RESUME_PARSER_WORKERS", "2"))
+resume_parser_executor = (
+    ProcessPoolExecutor(max_workers=RESUME_PARSER_WORKERS)
+    if RESUME_PARSER_POOL == "process"
+    else ThreadPoolExecutor(max_workers=RESUME_PARSER_WORKERS)
+)
+
+# Set PRELOAD_ON_STARTUP=1 to load the heavy dependencies in the background right after
+# startup, so health checks pass immediately and the first real request finds them ready
+PRELOAD_ON_STARTUP = os.getenv("PRELOAD_ON_STARTUP", "0") == "1"
+
+# Jobs beyond this many are shortlisted lexically (BM25) before anything is embedded; 0 disables
+LEXICAL_PREFILTER_DEPTH = int(os.getenv("LEXICAL_PREFILTER_DEPTH", "50"))
+# Larger pools keep this share of their jobs instead, so the shortlist grows with the pool
+# (a fixed 50 kept about half of the true top 10 at 1000 jobs in bench_lexical_prefilter)
+LEXICAL_PREFILTER_FRACTION = float(os.getenv("LEXICAL_PREFILTER_FRACTION", "0.2"))
+# Fraction of prefiltered requests that also embed every job, to log recall@k of the shortlist
+# (benchmarks/bench_lexical_prefilter.py measures it offline)
+LEXICAL_RECALL_SAMPLE_RATE = float(os.getenv("LEXICAL_RECALL_SAMPLE_RATE", "0.01"))
+# Job texts kept in the lexical index; the least recently requested are dropped first
+LEXICAL_INDEX_MAX_JOBS = int(os.getenv("LEXICAL_INDEX_MAX_JOBS", "50000"))
+
+# Inverted index of the job texts seen recently, keyed by stable_job_id
+job_lexical_index = BM25Index(max_docs=LEXICAL_INDEX_MAX_JOBS)
+
+# Persistent near-duplicate index of every posting seen; loading it reads every fingerprint
+@load_once("job_fingerprints")
+def get_job_fingerprints() -> JobFingerprintIndex:
+    return JobFingerprintIndex()
+
+# Global vector database instance, also the persistent corpus of every job seen so far.
+# Created on first use since opening the index loads faiss.
+@load_once("vector_db")
+def get_vector_db() -> VectorDatabase:
+    return VectorDatabase()
+
+# Separate process pool for bulk uploads, sized to the machine, so a cohort upload
+# uses every core without starving single /parse_resume/ requests
+@load_once("bulk_parser_pool")
+def get_bulk_parser_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=BULK_PARSER_WORKERS)
+
+# Loads everything the request handlers would otherwise load on first use.
+# Returns {loader name: error} for the ones that failed; they are retried on first use.
+def warmup_dependencies() -> dict:
+    errors = {}
+    for loader in (get_client, get_async_client, get_nlp, get_faiss, get_vector_db, get_job_fingerprints,
+                   get_fitz, get_docx2txt):
+        try:
+            loader()
+        except Exception as e:
+            errors[loader.__name__] = str(e)
+            log_event("warmup_failed", level=logging.WARNING, loader=loader.__name__, error=str(e))
+    # The spaCy model is loaded again in every worker of a process pool
+    if RESUME_PARSER_POOL == "process":
+        for _ in range(RESUME_PARSER_WORKERS):
+            resume_parser_executor.submit(get_nlp)
+    return errors
+
+@app.on_event("startup")
+async def report_startup():
+    report = load_report()
+    log_event(
+        "startup_imports",
+        sample_rate=1.0,
+        total_seconds=report["total_seconds"],
+        **{entry["name"]: entry["seconds"] for entry in report["modules"]},
+    )
+    if PRELOAD_ON_STARTUP:
+        asyncio.get_running_loop().run_in_executor(None, warmup_dependencies)
+
+@app.on_event("shutdown")
+def save_job_index():
+    if get_vector_db.is_loaded():
+        get_vector_db().save()
+    from agents.embed import embedding_cache
+    if embedding_cache is not None:
+        embedding_cache.compact()
+    if get_bulk_parser_executor.is_loaded():
+        get_bulk_parser_executor().shutdown(cancel_futures=True)
 
 # Country name to ISO 3166-1 alpha-2 code mapping
 COUNTRY_CODE_MAPPING = {
@@ -75,38 +184,19 @@ def get_country_code(country_name: str) -> str:
     """Convert full country name to two-letter ISO code."""
     return COUNTRY_CODE_MAPPING.get(country_name.strip(), None)
 
-# Converts the list of dictionaries of job postings to a list of strings for embedding
+# Converts the list of dictionaries of job postings to a list of strings for embedding.
+# Boilerplate (EEO, benefits) is stripped and each text is capped at JOB_TEXT_MAX_TOKENS tokens.
 def build_job_texts(jobs: list[dict]) -> list[str]:
-    job_texts = []
-    
-    for job in jobs:
-        text = f"""
-        Job Title: {job.get('job_title', '')}
-        Job Publisher: {job.get('job_publisher', '')}
-        Employment Type: {job.get('job_employment_type', '')}
-        Location: {job.get('job_location', '')}
-        Job Description: {job.get('job_description', '')}
-        """.strip()
-        
-        job_texts.append(text)
-    
-    return job_texts
+    return [build_job_text(job) for job in jobs]
 
-# Concatenates the resume summary and the chat history
-def combine_summary_and_chat(resume_summary: dict, chat_history: list[dict]) -> str:
+# Concatenates the resume summary and the chat history (older turns summarized by the memory)
+def combine_summary_and_chat(resume_summary: dict, chat_history: list[dict], memory: ConversationMemory = None) -> str:
     # Format the resume summary
-    formatted_summary = f"""
-    Summary:
-    {resume_summary.get('Summary', 'No summary provided.')}
-
-    Key Projects:
-    {resume_summary.get('Projects', 'No projects listed.')}
-    """.strip()
+    formatted_summary = resume_profile_text(resume_summary)
 
     # Format the chat history
-    formatted_chat_history = "\n".join(
-        [f"{msg['role'].capitalize()}: {msg['content']}" for msg in chat_history]
-    )
+    memory = memory if memory is not None else ConversationMemory()
+    formatted_chat_history = memory.render(chat_history)
 
     # Combine the formatted summary and chat history
     combined_text = f"""
@@ -120,107 +210,306 @@ def combine_summary_and_chat(resume_summary: dict, chat_history: list[dict]) ->
     return combined_text
 
 # Compares the candidate vector with the job vectors and returns the top_k most similar jobs using cosine similarity
-def rank_jobs_by_similarity(candidate_vector, job_vectors, jobs, top_k):
+def rank_jobs_by_similarity(candidate_vector, job_vectors, jobs, top_k, normalized=False):
     """
     Rank job listings by similarity to the candidate vector.
 
     Parameters:
     - candidate_vector: list[float] or np.array, the embedded resume+intent vector
-    - job_vectors: list[list[float]], embeddings of job listings
+    - job_vectors: list[list[float]] or np.array, embeddings of job listings
+      (pass the output of normalize_rows together with normalized=True to skip re-normalizing)
     - jobs: list[dict], original job dictionaries aligned with job_vectors
     - top_k: int, number of top matches to return
 
     Returns:
     - list of tuples: (job_dict, similarity_score)
     """
+    return rank_jobs_for_candidates([np.ravel(candidate_vector)], job_vectors, jobs, top_k, normalized)[0]
+
+# Scores many candidate vectors against the same jobs in one matrix product
+def rank_jobs_for_candidates(candidate_vectors, job_vectors, jobs, top_k, normalized=False):
+    """Returns one list of top_k (job_dict, similarity_score) tuples per candidate vector."""
     if len(jobs) != len(job_vectors):
         raise ValueError("Length of jobs and job_vectors must be the same.")
 
-    # Ensure vectors are NumPy arrays
-    job_matrix = np.array(job_vectors)
-    candidate_vec = np.array(candidate_vector).reshape(1, -1)
+    candidate_matrix = np.asarray(candidate_vectors, dtype=np.float32) if normalized else normalize_rows(candidate_vectors)
+    job_matrix = np.asarray(job_vectors, dtype=np.float32) if normalized else normalize_rows(job_vectors)
+    indices, scores = rank_top_k(candidate_matrix, job_matrix, top_k, normalized=True)
 
-    # Compute cosine similarity scores
-    similarities = cosine_similarity(candidate_vec, job_matrix)[0]
+    # Return top_k (job_dict, score) pairs
+    return [
+        [(jobs[i], float(score)) for i, score in zip(row_indices, row_scores)]
+        for row_indices, row_scores in zip(indices, scores)
+    ]
 
-    # Sort indices by highest similarity
-    sorted_indices = np.argsort(similarities)[::-1][:top_k]
+# Formats stage timings (in seconds) as a Server-Timing header value in milliseconds
+def format_server_timing(timings: dict) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
 
-    # Return top_k (job_dict, score) pairs
-    return [(jobs[i], similarities[i]) for i in sorted_indices]
 
+# Wraps an async generator of text chunks as server-sent events.
+# Chunks are JSON-encoded so newlines inside them survive the SSE framing.
+# A failure mid-stream is reported as an "error" event since the status code is already sent.
+async def sse_events(chunks):
+    try:
+        async for chunk in chunks:
+            yield f"data: {json.dumps(chunk)}\n\n"
+    except Exception as e:
+        log_event("sse_stream_failed", level=logging.ERROR, error=str(e))
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+# The session's rolling conversation memory, or a fresh one when the caller sends its own history
+def load_memory(session: dict, own_history: bool = False) -> ConversationMemory:
+    if own_history:
+        return ConversationMemory()
+    return ConversationMemory.from_dict(session.get("memory"))
+
+# Logs how many history tokens went into a prompt next to what the full history would have cost
+def log_prompt_tokens(stage: str, memory: ConversationMemory):
+    log_event("prompt_history_tokens", stage=stage, **memory.last_render_stats)
+
+# Work that shouldn't delay the response; references are kept so tasks aren't garbage collected
+background_tasks = set()
+
+def run_in_background(coroutine):
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+# Folding old turns into the summary takes an LLM call, so it runs after the reply is sent
+def schedule_memory_fold(session_id: str, memory: ConversationMemory, chat_history: list[dict]):
+    if not memory.needs_fold(chat_history):
+        return
+
+    async def fold():
+        if await memory.afold(chat_history):
+            await run_in_threadpool(session_store.update, session_id, memory=memory.to_dict())
+
+    run_in_background(fold())
+
+# How many of job_count jobs the lexical prefilter keeps; 0 keeps them all
+def prefilter_depth(job_count: int) -> int:
+    if LEXICAL_PREFILTER_DEPTH <= 0:
+        return 0
+    return max(LEXICAL_PREFILTER_DEPTH, math.ceil(LEXICAL_PREFILTER_FRACTION * job_count))
+
+# Positions of the jobs worth embedding: the depth best BM25 matches for query_text.
+# Every job text is added to the lexical index the first time it is seen.
+def lexical_shortlist(job_ids: list[int], job_texts: list[str], query_text: str, depth: int) -> list[int]:
+    for job_id, text in zip(job_ids, job_texts):
+        if job_id in job_lexical_index:
+            job_lexical_index.touch(job_id)
+        else:
+            job_lexical_index.add(job_id, text)
+    if depth <= 0 or len(job_ids) <= depth:
+        return list(range(len(job_ids)))
+
+    first_position = {}
+    for position, job_id in enumerate(job_ids):
+        first_position.setdefault(job_id, position)
+    shortlist = [first_position[job_id] for job_id, _ in job_lexical_index.search(query_text, depth, doc_ids=job_ids)]
+
+    # Too few lexical matches: fill up with the remaining jobs in their original order
+    if len(shortlist) < depth:
+        chosen = set(shortlist)
+        shortlist += [position for position in first_position.values() if position not in chosen][:depth - len(shortlist)]
+    return shortlist
+
+# Embeds every job and logs how many of the exhaustive top k the prefiltered ranking found
+async def log_prefilter_recall(candidate_vector, jobs: list[dict], ranked_positions: list[int], top_k: int):
+    job_vectors, _ = await run_in_threadpool(embed_jobs, jobs)
+    exhaustive = rank_jobs_by_similarity(candidate_vector, job_vectors, list(range(len(jobs))), top_k, normalized=True)
+    recall = recall_at_k(ranked_positions, [position for position, _ in exhaustive], top_k)
+    log_event("prefilter_recall", sample_rate=1.0, jobs=len(jobs), depth=prefilter_depth(len(jobs)),
+              top_k=top_k, recall_at_k=round(recall, 4))
+
+# Loads a server-side session or fails the request with 404
+async def get_session_or_404(session_id: str) -> dict:
+    session = await run_in_threadpool(session_store.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
 
 # --------------------------------------  FASTAPI Functions ----------------------------------------------------
 
+# Cheap liveness check: never loads any of the lazy dependencies
+@app.get('/health')
+async def health():
+    return {"status": "ok"}
+
+# Loads every lazy dependency now instead of on the first real request.
+# Returns the per-module load times, including the imports done at startup.
+@app.get('/warmup')
+async def warmup():
+    start = time.perf_counter()
+    errors = await run_in_threadpool(warmup_dependencies)
+    return {"warmup_seconds": round(time.perf_counter() - start, 4), "errors": errors, **load_report()}
+
+# Creating a server-side session so later requests only send a session ID and deltas
+class CreateSessionRequest(BaseModel):
+    country: str | None = None
+    resume_summary: dict | None = None
+    chat_history: list[dict] | None = None
+
+@app.post('/sessions/')
+async def create_session(request: CreateSessionRequest = None):
+    fields = request.model_dump(exclude_none=True) if request is not None else {}
+    return {"session_id": await run_in_threadpool(session_store.create, **fields)}
+
+@app.delete('/sessions/{session_id}')
+async def delete_session(session_id: str):
+    await run_in_threadpool(session_store.delete, session_id)
+    return {"deleted": session_id}
+
 class ResumeParserRequest(BaseModel):
     file: UploadFile
     country: str
 
 @app.post('/parse_resume/')
 async def parse_resume(
+    response: Response,
     file: UploadFile = File(...),
-    country: str = Form(...)
+    country: str = Form(...),
+    session_id: str | None = Form(None),
+    mode: str = Form(RESUME_PARSE_MODE)
     ):
-        # Step 1 : Extract raw text from uploaded file
-        
+        if mode not in RESUME_PARSE_MODES:
+            raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(RESUME_PARSE_MODES)}")
+
+        # Extract the text and run the parsers of the chosen mode ("fast": one structured LLM call,
+        # "thorough": LLM parse plus reconciliation). Repeat uploads of the same document are answered from the resume cache.
         contents = await file.read()
-        file_type = file.filename.split('.')[-1].lower()
-
-        if file_type == 'pdf':
-            with fitz.open(stream=contents, filetype="pdf") as doc:
-                text = "\n".join([page.get_text() for page in doc])
-        elif file_type in ['docx', 'doc']:
-            with open(f"/tmp/{file.filename}", 'wb') as f:
-                f.write(contents)
-            text = docx2txt.process(file.filename)
-        else:
+        try:
+            parsed_resume, timings = await aparse_resume_document(contents, file.filename, country, resume_parser_executor, mode=mode)
+        except UnsupportedFileType:
             return {"error": "Unsupported file type"}
-        
-        # print(f"Extracted text from {file.filename} ({file_type}):\n {text}", flush=True)
-          
-        
-        # Step 2 : Run the traditional and LLM parsers
-        traditional_data = traditional_resume_parser(text, country)
-        # print(f"Traditional Parser Output: {traditional_data}", flush=True)
-        
-        llm_data = llm_resume_parser(text, country)
-        # print(f"LLM Parser Output: {llm_data}", flush=True)
-        
-        # Step 3 : Reconcile the two using LLM
-        parsed_resume = reconcile_parsed_outputs(traditional_data, llm_data)
-        # print(f"Final Result: {parsed_resume}", flush=True)
-        
+
+        if session_id and "error" not in parsed_resume:
+            await run_in_threadpool(session_store.update, session_id, resume_summary=parsed_resume, country=country)
+        response.headers["Server-Timing"] = format_server_timing(timings)
+
         return parsed_resume
 
+# Bulk onboarding: any mix of PDF/DOCX files and zip archives of them. One NDJSON line is
+# streamed per document as soon as it is parsed: {"index", "filename", "status", ...}
+# with "resume" on success and "error" on failure.
+@app.post('/parse_resumes/bulk')
+async def parse_resumes_bulk(
+    files: list[UploadFile] = File(...),
+    country: str = Form(...),
+    max_concurrency: int | None = Form(None),
+    mode: str = Form(RESUME_PARSE_MODE)
+    ):
+    if mode not in RESUME_PARSE_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(RESUME_PARSE_MODES)}")
+    uploads = [(file.filename, await file.read()) for file in files]
+    # The limit counts the documents inside zips, so it is checked while they are expanded
+    try:
+        documents = await run_in_threadpool(expand_uploads, uploads, BULK_MAX_FILES)
+    except TooManyDocuments as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Callers may ask for less LLM concurrency than the server allows, never more
+    llm_max_concurrency = min(max_concurrency or BULK_LLM_MAX_CONCURRENCY, BULK_LLM_MAX_CONCURRENCY)
+    executor = await run_in_threadpool(get_bulk_parser_executor)
+    log_event("bulk_parse_request", files=len(uploads), documents=len(documents), max_concurrency=llm_max_concurrency, mode=mode)
+
+    async def results():
+        async for result in aingest_resumes(documents, country, executor, llm_max_concurrency, mode):
+            if result["status"] == "error":
+                log_event("bulk_parse_failed", level=logging.ERROR, filename=result["filename"], error=result["error"])
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+# With a session_id only the new query is sent; the history and resume come from the session
+# and both turns are appended to it. Without one, the full context is sent as before.
 class QueryResponseRequest(BaseModel):
     query: str
-    resume_summary: dict
-    chat_history: list[dict]
+    session_id: str | None = None
+    resume_summary: dict | None = None
+    chat_history: list[dict] | None = None
+
+async def load_chat_context(request: QueryResponseRequest) -> tuple[dict, list[dict], ConversationMemory]:
+    if request.session_id is None:
+        return request.resume_summary or {}, request.chat_history or [], ConversationMemory()
+    session = await get_session_or_404(request.session_id)
+    resume_summary = request.resume_summary or session["resume_summary"] or {}
+    chat_history = session["chat_history"] + [{"role": "user", "content": request.query}]
+    return resume_summary, chat_history, load_memory(session)
+
+async def save_chat_turn(session_id: str, query: str, reply: str, memory: ConversationMemory):
+    session = await run_in_threadpool(session_store.append_chat, session_id, [
+        {"role": "user", "content": query},
+        {"role": "assistant", "content": reply},
+    ])
+    if session is not None:
+        schedule_memory_fold(session_id, memory, session["chat_history"])
     
 @app.post('/get_query_response/')
 async def get_query_response(request: QueryResponseRequest):
-    return get_llm_response(request.query, request.resume_summary, request.chat_history)
+    resume_summary, chat_history, memory = await load_chat_context(request)
+    reply = await aget_llm_response(request.query, resume_summary, chat_history, memory)
+    log_prompt_tokens("chat", memory)
+    if request.session_id is not None:
+        await save_chat_turn(request.session_id, request.query, reply, memory)
+    return reply
+
+# Same as /get_query_response/, but streams the reply token by token as server-sent events
+@app.post('/get_query_response/stream')
+async def get_query_response_stream(request: QueryResponseRequest):
+    resume_summary, chat_history, memory = await load_chat_context(request)
+
+    async def chunks():
+        reply_parts = []
+        async for chunk in astream_llm_response(request.query, resume_summary, chat_history, memory):
+            reply_parts.append(chunk)
+            yield chunk
+        log_prompt_tokens("chat_stream", memory)
+        if request.session_id is not None:
+            await save_chat_turn(request.session_id, request.query, "".join(reply_parts), memory)
+
+    return StreamingResponse(
+        sse_events(chunks()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
+# With a session_id the jobs are kept server-side and only their count is returned
 class RetrieveJobsRequest(BaseModel):
-    country: str
-    resume_summary: dict
-    chat_history: list[dict]
+    session_id: str | None = None
+    country: str | None = None
+    resume_summary: dict | None = None
+    chat_history: list[dict] | None = None
     
 @app.post('/retrieve_jobs/')
 async def retrieve_jobs(request: RetrieveJobsRequest):
-        jsearch_query = generate_query_for_jobsearch(request.resume_summary, request.chat_history)
-        country = get_country_code(request.country)
-        print(f"Country Code: {country},\nJsearch Query:{jsearch_query}", flush=True)
-        raw_jobs_data = get_jobs(jsearch_query, country)
+        session = (await get_session_or_404(request.session_id)) if request.session_id else new_session()
+        resume_summary = request.resume_summary or session["resume_summary"] or {}
+        chat_history = request.chat_history if request.chat_history is not None else session["chat_history"]
+        memory = load_memory(session, own_history=request.chat_history is not None)
+        country_name = request.country or session["country"] or ""
+
+        # Memoized per resume and recent chat; simple requests skip the LLM via keyword rules
+        jsearch_query, query_source = await aresolve_jobsearch_query(resume_summary, chat_history, memory)
+        if query_source == "llm":
+            log_prompt_tokens("extract_query", memory)
+        country = get_country_code(country_name)
+        log_event("retrieve_jobs", country=country, jsearch_query=jsearch_query, query_source=query_source)
+        raw_jobs_data = await aget_jobs(jsearch_query, country)
         
         # Define the keys you want to keep
         selected_keys = [
+            "job_id", # JSearch's ID for the posting, used to deduplicate the job corpus
             "job_publisher", # The company which put up the job
             "job_employment_type", # The type of employment (e.g., full-time, part-time, etc.)
             "job_title", # The title of the job Eg: Software Engineer, Data Scientist, etc.
             "job_apply_link", # Application Link
             "job_description", # The description of the job
             "job_location", # The location of the job
+            "employer_name", # The hiring company; with the location, it keeps near-identical postings of different jobs apart
         ]
         
         # Filter the keys in each job dictionary
@@ -233,36 +522,91 @@ async def retrieve_jobs(request: RetrieveJobsRequest):
         # Add the job to the list of jobs
         # print(f"Job: {jobs}", flush=True)
         # print(f"Jobs: {raw_jobs_data['data'][0]}", flush=True)
+
+        if request.session_id:
+            # The country searched becomes the session's, so corpus-scoped filter_jobs filters on it
+            await run_in_threadpool(session_store.update, request.session_id, jobs=jobs, country=country_name or None)
+            return {"session_id": request.session_id, "job_count": len(jobs)}
         
         return jobs
 
 # Filtering the job listings based on the resume summary and chat context
+# With a session_id, jobs, resume summary and chat history default to the ones stored in the session.
+# search_scope "corpus" ranks every job seen so far (in the session's country) instead of just these jobs.
 class FilterJobsRequest(BaseModel):
-    jobs: list[dict]
-    resume_summary: dict
-    chat_history: list[dict]
     top_k: int
+    session_id: str | None = None
+    search_scope: str = "session"
+    jobs: list[dict] | None = None
+    resume_summary: dict | None = None
+    chat_history: list[dict] | None = None
     
 @app.post('/filter_jobs/')
 async def filter_jobs(request: FilterJobsRequest):
+    session = (await get_session_or_404(request.session_id)) if request.session_id else new_session()
+    jobs = request.jobs if request.jobs is not None else session["jobs"]
+    resume_summary = request.resume_summary or session["resume_summary"] or {}
+    chat_history = request.chat_history if request.chat_history is not None else session["chat_history"]
+    memory = load_memory(session, own_history=request.chat_history is not None)
+    country = get_country_code(session["country"] or resume_summary.get("Country") or "")
+    if not jobs and request.search_scope != "corpus":
+        return []
     
-    # Getting embeddings of jobs
-    job_texts = build_job_texts(request.jobs)
-    job_texts_embeddings = get_embeddings(job_texts)
-    # print(len(job_texts_embeddings), flush=True)
-    # print(len(job_texts_embeddings[0]), flush=True)
-    
-    
+    # The same posting from several publishers is embedded and ranked once, as its canonical copy,
+    # with every publisher's apply link in job_apply_links
+    if jobs:
+        job_fingerprints = await run_in_threadpool(get_job_fingerprints)
+        received = len(jobs)
+        jobs = await run_in_threadpool(job_fingerprints.dedupe, jobs)
+        log_event("dedupe_jobs", jobs=received, duplicates=received - len(jobs))
+
     # Combining the resume summary and chat history into a single string for the vector database(vdb) or candidate embedding
     # Resume summary is a dictionary with keys: Name, Summary, Projects, Country
     # Chat history is a list of dictionaries with keys: role and content
-    combined_string_vdb = combine_summary_and_chat(request.resume_summary, request.chat_history)
+    combined_string_vdb = combine_summary_and_chat(resume_summary, chat_history, memory)
+    log_prompt_tokens("candidate_text", memory)
+
+    # Lexical prefilter: with many jobs, only the best BM25 matches for the candidate are embedded
+    # Both tokenize every description, so they run off the event loop
+    job_texts = await run_in_threadpool(build_job_texts, jobs)
+    shortlist = await run_in_threadpool(lexical_shortlist, [stable_job_id(job) for job in jobs], job_texts,
+                                        combined_string_vdb, prefilter_depth(len(jobs)))
+    shortlisted_jobs = [jobs[i] for i in shortlist]
+
+    # Getting embeddings of jobs (from token-budgeted texts, or pooled chunks with JOB_TEXT_CHUNKING=1)
+    job_texts_embeddings, embedding_stats = await run_in_threadpool(embed_jobs, shortlisted_jobs)
+    log_event("embed_jobs", jobs=len(job_texts), shortlisted=len(shortlist), cache_hits=embedding_stats["cache_hits"],
+              batches=embedding_stats["batch_count"], batch_latencies=embedding_stats["batch_latencies"],
+              tokens_before=embedding_stats["tokens_before"], tokens_after=embedding_stats["tokens_after"])
+    # print(len(job_texts_embeddings), flush=True)
+    # print(len(job_texts_embeddings[0]), flush=True)
+
+    # Add the jobs to the persistent corpus; their vectors are already computed, so nothing is re-embedded.
+    # Jobs cut by the prefilter are left out rather than embedded just for the corpus.
+    # The first call opens the index (and loads faiss), so it happens off the event loop too.
+    vector_db = await run_in_threadpool(get_vector_db)
+    if shortlisted_jobs:
+        await run_in_threadpool(vector_db.upsert_jobs, shortlisted_jobs, job_texts_embeddings, None, country)
+        await run_in_threadpool(vector_db.save_if_due)
     
     # We can use two methods for comparing the job postings with resume summary and chat history
     
     # 1. Using the embeddings of the job postings and the combined string to get the most relevant job postings
-    candidate_embedding = get_embeddings(combined_string_vdb)
-    top_matches = rank_jobs_by_similarity(candidate_embedding, job_texts_embeddings, request.jobs, request.top_k)
+    # The candidate vector comes from the resume profile and each chat message embedded separately
+    # (only new messages reach the API), or from combined_string_vdb with CANDIDATE_VECTOR_MODE=combined
+    vector, candidate_stats = await run_in_threadpool(candidate_vector, resume_summary, chat_history, combined_string_vdb)
+    log_event("embed_candidate", **candidate_stats)
+    # Job vectors come back as unit rows, so only the single candidate row is normalized here
+    candidate_embedding = normalize_rows(vector)
+    if request.search_scope == "corpus":
+        top_matches = await run_in_threadpool(vector_db.search_jobs, candidate_embedding[0], request.top_k, country)
+    else:
+        ranked = rank_jobs_by_similarity(candidate_embedding, job_texts_embeddings, shortlist, request.top_k,
+                                         normalized=True)
+        top_matches = [(jobs[position], score) for position, score in ranked]
+        if len(shortlist) < len(jobs) and random.random() < LEXICAL_RECALL_SAMPLE_RATE:
+            run_in_background(log_prefilter_recall(candidate_embedding, jobs,
+                                                   [position for position, _ in ranked], request.top_k))
 
     # print(len(candidate_embedding), flush=True)
     # print(len(candidate_embedding[0]), flush=True)
@@ -280,34 +624,71 @@ class CoverLetterRequest(BaseModel):
 async def generate_cover_letter_endpoint(request: CoverLetterRequest):
     """Generate a cover letter"""
     try:
-        from agents.cv_generation import generate_cover_letter
+        from agents.cv_generation import agenerate_cover_letter
         
-        # Debug prints
-        print("\n=== Cover Letter Generation Request ===")
-        print(f"Resume Summary: {request.resume_summary}")
-        print(f"Job Details: {request.job_details}")
+        log_event("cover_letter_request", name=request.resume_summary.get("Name"),
+                  job_title=request.job_details.get("job_title"),
+                  job_description_chars=len(request.job_details.get("job_description") or ""))
         
-        cover_letter = generate_cover_letter(
+        cover_letter = await agenerate_cover_letter(
             resume_summary=request.resume_summary,
             job_details=request.job_details
         )
         
         if cover_letter is None:
             error_msg = "Cover letter generation failed - received None from generator"
-            print(f"\nError: {error_msg}")
+            log_event("cover_letter_failed", level=logging.ERROR, error=error_msg)
             return {"error": error_msg}
         
-        print("\n=== Generated Cover Letter ===")
-        print(cover_letter[:100] + "...")  # Print first 100 chars
+        log_event("cover_letter_generated", job_title=request.job_details.get("job_title"),
+                  letter_chars=len(cover_letter), preview=cover_letter[:100])
         return {"cover_letter": cover_letter}
     
     except Exception as e:
         error_msg = f"Cover letter generation failed: {str(e)}"
-        print(f"\nError: {error_msg}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        log_event("cover_letter_failed", level=logging.ERROR, error=error_msg)
         return {"error": error_msg}
 
+# Same as /generate_cover_letter/, but streams the letter as server-sent events while it is written
+@app.post('/generate_cover_letter/stream')
+async def generate_cover_letter_stream(request: CoverLetterRequest):
+    from agents.cv_generation import astream_cover_letter
+
+    log_event("cover_letter_stream_request", name=request.resume_summary.get("Name"),
+              job_title=request.job_details.get("job_title"))
+
+    chunks = astream_cover_letter(request.resume_summary, request.job_details)
+    return StreamingResponse(
+        sse_events(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# generating cover letters for many jobs at once
+class BatchCoverLetterRequest(BaseModel):
+    resume_summary: dict
+    jobs: list[dict]
+    max_concurrency: int | None = None
+
+# Streams one NDJSON line per job as soon as its letter is ready:
+# {"index": i, "job_title": ..., "cover_letter": ...} or {"index": i, "job_title": ..., "error": ...}
+@app.post('/generate_cover_letters/batch')
+async def generate_cover_letters_batch(request: BatchCoverLetterRequest):
+    from agents.cv_generation import agenerate_cover_letters, COVER_LETTER_MAX_CONCURRENCY
+
+    # Callers may ask for less concurrency than the server allows, never more
+    max_concurrency = min(request.max_concurrency or COVER_LETTER_MAX_CONCURRENCY, COVER_LETTER_MAX_CONCURRENCY)
+    log_event("cover_letter_batch_request", jobs=len(request.jobs), max_concurrency=max_concurrency)
+
+    async def results():
+        async for index, result in agenerate_cover_letters(request.resume_summary, request.jobs, max_concurrency):
+            if "error" in result:
+                log_event("cover_letter_failed", level=logging.ERROR, index=index, error=result["error"])
+            line = {"index": index, "job_title": request.jobs[index].get("job_title"), **result}
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
     
 if __name__ == '__main__':
     uvicorn.run(app, host = '127.0.0.1', port = 8000)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from agents.embed import embed_texts
+from agents.tokenizer import truncate_to_tokens
+
+# "incremental": the resume profile and every chat message are embedded on their own and
+# combined into one vector, so a new search only embeds the messages added since the last one.
+# "combined": the whole resume + conversation text is embedded as one input, as before.
+CANDIDATE_VECTOR_MODES = ("incremental", "combined")
+CANDIDATE_VECTOR_MODE = os.getenv("CANDIDATE_VECTOR_MODE", "incremental")
+# Share of the candidate vector that comes from the resume; the rest comes from the chat
+CANDIDATE_RESUME_WEIGHT = float(os.getenv("CANDIDATE_RESUME_WEIGHT", "0.6"))
+# Each message counts this much less than the one after it, so recent intent dominates
+CANDIDATE_TURN_DECAY = float(os.getenv("CANDIDATE_TURN_DECAY", "0.8"))
+# Assistant messages echo the user's intent at length; they count this much relative to user ones
+CANDIDATE_ASSISTANT_WEIGHT = float(os.getenv("CANDIDATE_ASSISTANT_WEIGHT", "0.5"))
+CANDIDATE_TURN_MAX_TOKENS = int(os.getenv("CANDIDATE_TURN_MAX_TOKENS", "256"))
+# Finished candidate vectors, keyed on a hash of the resume profile and the history
+CANDIDATE_VECTOR_CACHE_ITEMS = int(os.getenv("CANDIDATE_VECTOR_CACHE_ITEMS", "256"))
+
+_vector_cache = OrderedDict()
+_vector_cache_lock = threading.Lock()
+
+
+def resume_profile_text(resume_summary: dict) -> str:
+    return f"""
+    Summary:
+    {resume_summary.get('Summary', 'No summary provided.')}
+
+    Key Projects:
+    {resume_summary.get('Projects', 'No projects listed.')}
+    """.strip()
+
+
+def turn_text(msg: dict) -> str:
+    return truncate_to_tokens(f"{msg['role'].capitalize()}: {msg['content']}", CANDIDATE_TURN_MAX_TOKENS)
+
+
+def turn_weights(chat_history: list[dict]) -> np.ndarray:
+    """Recency-decayed weight of every message, newest = 1, assistant messages scaled down."""
+    weights = np.array([CANDIDATE_TURN_DECAY ** (len(chat_history) - 1 - i) for i in range(len(chat_history))])
+    roles = np.array([msg["role"] == "assistant" for msg in chat_history], dtype=bool)
+    weights[roles] *= CANDIDATE_ASSISTANT_WEIGHT
+    return weights
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+def combine_candidate_vectors(resume_vector, turn_vectors, weights, resume_weight: float = CANDIDATE_RESUME_WEIGHT):
+    """resume_weight * resume + (1 - resume_weight) * weighted mean of the messages, as a unit vector."""
+    parts = []
+    if resume_vector is not None:
+        parts.append((resume_weight, _unit(np.asarray(resume_vector, dtype=np.float32))))
+    if len(turn_vectors):
+        matrix = np.asarray(turn_vectors, dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        chat_vector = _unit(np.asarray(weights, dtype=np.float32) @ matrix)
+        parts.append((1 - resume_weight if resume_vector is not None else 1.0, chat_vector))
+    return _unit(sum(weight * vector for weight, vector in parts))
+
+
+def _cache_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def candidate_vector(resume_summary: dict, chat_history: list[dict], combined_text: str = None,
+                     mode: str = CANDIDATE_VECTOR_MODE) -> tuple[list[float], dict]:
+    """
+    The candidate vector jobs are ranked against, and stats of how it was obtained.
+
+    Finished vectors are memoized on a hash of their inputs, and the per-text vectors go
+    through the embedding cache, so within a session only messages added since the last
+    search reach the API, in a single call. combined_text is required in "combined" mode.
+    """
+    if mode == "combined":
+        key = _cache_key(mode, combined_text)
+    else:
+        profile = resume_profile_text(resume_summary)
+        turns = [turn_text(msg) for msg in chat_history]
+        key = _cache_key(mode, profile, turns, CANDIDATE_RESUME_WEIGHT, CANDIDATE_TURN_DECAY, CANDIDATE_ASSISTANT_WEIGHT)
+
+    with _vector_cache_lock:
+        if key in _vector_cache:
+            _vector_cache.move_to_end(key)
+            return _vector_cache[key], {"memoized": True, "texts": 0, "cache_hits": 0, "embedded": 0}
+
+    if mode == "combined":
+        vectors, stats = embed_texts(combined_text)
+        vector = vectors[0]
+        texts = 1
+    else:
+        vectors, stats = embed_texts([profile] + turns)
+        vector = combine_candidate_vectors(vectors[0], vectors[1:], turn_weights(chat_history)).tolist()
+        texts = 1 + len(turns)
+
+    with _vector_cache_lock:
+        _vector_cache[key] = vector
+        while len(_vector_cache) > CANDIDATE_VECTOR_CACHE_ITEMS:
+            _vector_cache.popitem(last=False)
+
+    return vector, {"memoized": False, "texts": texts, "cache_hits": stats["cache_hits"],
+                    "embedded": texts - stats["cache_hits"]}
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from agents.cache import CACHE_DIR
+
+# JSearch returns the same posting through several publishers (LinkedIn, Indeed, ...).
+# Each posting gets a 64-bit SimHash of its title + description; postings of the same employer
+# and location whose fingerprints differ in at most JOB_DEDUP_MAX_DISTANCE bits are one job.
+JOB_DEDUP_PATH = os.getenv("JOB_DEDUP_PATH", os.path.join(CACHE_DIR, "job_fingerprints.sqlite"))
+JOB_DEDUP_MAX_DISTANCE = int(os.getenv("JOB_DEDUP_MAX_DISTANCE", "3"))
+# Postings not seen for this long are forgotten; past JOB_DEDUP_MAX_ENTRIES the stalest go first
+JOB_DEDUP_TTL_SECONDS = int(os.getenv("JOB_DEDUP_TTL_SECONDS", str(30 * 24 * 3600)))
+JOB_DEDUP_MAX_ENTRIES = int(os.getenv("JOB_DEDUP_MAX_ENTRIES", "200000"))
+SHINGLE_WORDS = 3
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over the word 3-shingles of text (0 for empty text)."""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0
+    shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))]
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big") for shingle in shingles],
+        dtype=np.uint64,
+    )
+    # One row of 64 bits per shingle; each bit votes +1/-1 and the majority sets the fingerprint bit
+    bits = np.unpackbits(hashes.byteswap().view(np.uint8).reshape(-1, 8), axis=1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int("".join("1" if vote > 0 else "0" for vote in votes), 2)
+
+
+def job_fingerprint_text(job: dict) -> str:
+    return f"{job.get('job_title') or ''} {job.get('job_description') or ''}"
+
+
+# The same role posted for several cities (or by several employers) stays several jobs:
+# only postings with the same scope are compared
+def job_scope(job: dict) -> str:
+    return "|".join(" ".join(str(job.get(field) or "").lower().split()) for field in ("employer_name", "job_location"))
+
+
+def _apply_link(job: dict):
+    if not job.get("job_apply_link"):
+        return None
+    return {"publisher": job.get("job_publisher"), "link": job["job_apply_link"]}
+
+
+class JobFingerprintIndex:
+    """
+    Persistent SimHash index of the distinct postings seen recently.
+
+    Each (scope, fingerprint) maps to the canonical job (the first copy seen) and every apply
+    link seen for it. Only the fingerprints are held in memory; the jobs and links stay in
+    SQLite and are read for the postings a request matches. Lookups split fingerprints into
+    max_distance + 1 bands: two fingerprints within max_distance bits must agree exactly on
+    at least one band, so only postings of the same scope sharing a band are compared.
+    Postings expire ttl_seconds after they were last seen; past max_entries the least
+    recently seen are dropped.
+    """
+
+    def __init__(self, path: str = JOB_DEDUP_PATH, max_distance: int = JOB_DEDUP_MAX_DISTANCE,
+                 ttl_seconds: float = JOB_DEDUP_TTL_SECONDS, max_entries: int = JOB_DEDUP_MAX_ENTRIES):
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = -(-64 // self.band_count)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._keys = set()   # (scope, fingerprint) of every indexed posting
+        self._bands = [{} for _ in range(self.band_count)]  # (scope, band value) -> [fingerprints]
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_fingerprints ("
+            " scope TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " job TEXT NOT NULL,"
+            " links TEXT NOT NULL,"
+            " seen_at REAL NOT NULL,"
+            " PRIMARY KEY (scope, fingerprint))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS job_fingerprints_seen_at ON job_fingerprints (seen_at)")
+        self._db.execute("DELETE FROM job_fingerprints WHERE seen_at < ?", (time.time() - ttl_seconds,))
+        self._db.commit()
+        for scope, fingerprint in self._db.execute("SELECT scope, fingerprint FROM job_fingerprints"):
+            self._remember(scope, int(fingerprint, 16))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _band_values(self, fingerprint: int):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.band_count)]
+
+    def _remember(self, scope: str, fingerprint: int):
+        self._keys.add((scope, fingerprint))
+        for band, value in enumerate(self._band_values(fingerprint)):
+            self._bands[band].setdefault((scope, value), []).append(fingerprint)
+
+    def _forget(self, scope: str, fingerprint: int):
+        self._keys.discard((scope, fingerprint))
+        for band, value in enumerate(self._band_values(fingerprint)):
+            candidates = self._bands[band].get((scope, value), [])
+            if fingerprint in candidates:
+                candidates.remove(fingerprint)
+            if not candidates:
+                self._bands[band].pop((scope, value), None)
+
+    def find(self, scope: str, fingerprint: int):
+        """The indexed fingerprint of scope closest to fingerprint within max_distance bits, or None."""
+        best, best_distance = None, self.max_distance + 1
+        for band, value in enumerate(self._band_values(fingerprint)):
+            for candidate in self._bands[band].get((scope, value), ()):
+                distance = (candidate ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        return best
+
+    def _load_entry(self, scope: str, fingerprint: int):
+        row = self._db.execute("SELECT job, links FROM job_fingerprints WHERE scope = ? AND fingerprint = ?",
+                               (scope, f"{fingerprint:016x}")).fetchone()
+        return {"job": json.loads(row[0]), "links": json.loads(row[1])} if row else None
+
+    def _evict(self, now: float):
+        expired = self._db.execute("SELECT scope, fingerprint FROM job_fingerprints WHERE seen_at < ?",
+                                   (now - self.ttl_seconds,)).fetchall()
+        overflow = len(self._keys) - len(expired) - self.max_entries
+        if overflow > 0:
+            expired += self._db.execute(
+                "SELECT scope, fingerprint FROM job_fingerprints WHERE seen_at >= ? ORDER BY seen_at LIMIT ?",
+                (now - self.ttl_seconds, overflow)).fetchall()
+        if expired:
+            self._db.executemany("DELETE FROM job_fingerprints WHERE scope = ? AND fingerprint = ?", expired)
+            for scope, fingerprint in expired:
+                self._forget(scope, int(fingerprint, 16))
+
+    def dedupe(self, jobs: list[dict]) -> list[dict]:
+        """
+        Collapses near-duplicate postings, keeping the first appearance order.
+
+        Each survivor is the canonical copy of its posting (so its text, and therefore its
+        embedding, is the same every time it comes back) with job_apply_links listing
+        every publisher's link seen for it.
+        """
+        entries = {}     # (scope, canonical fingerprint) -> entry, in first appearance order
+        output = []      # jobs without text as-is, else the key of their entry
+        with self._lock:
+            for job in jobs:
+                fingerprint = simhash(job_fingerprint_text(job))
+                if fingerprint == 0:
+                    output.append(job)
+                    continue
+                scope = job_scope(job)
+                canonical = self.find(scope, fingerprint)
+                key = (scope, canonical)
+                if key not in entries:
+                    entry = self._load_entry(*key) if canonical is not None else None
+                    if entry is None:
+                        key = (scope, fingerprint)
+                        self._remember(*key)
+                        entry = {"job": dict(job), "links": []}
+                    if key not in entries:
+                        entries[key] = entry
+                        output.append(key)
+
+                link = _apply_link(job)
+                if link is not None and link not in entries[key]["links"]:
+                    entries[key]["links"].append(link)
+
+            if entries:
+                # Every posting seen is written back, which also renews its expiry
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO job_fingerprints (scope, fingerprint, job, links, seen_at) VALUES (?, ?, ?, ?, ?)",
+                    [(scope, f"{fp:016x}", json.dumps(entry["job"]), json.dumps(entry["links"]), now)
+                     for (scope, fp), entry in entries.items()],
+                )
+                self._evict(now)
+                self._db.commit()
+
+        return [item if isinstance(item, dict) else {**entries[item]["job"], "job_apply_links": list(entries[item]["links"])}
+                for item in output]
@@ -0,0 +1,94 @@
+import os
+import re
+
+import numpy as np
+from agents.embed import embed_texts
+from agents.vector_quantization import unit_rows
+from agents.tokenizer import count_tokens, truncate_to_tokens, split_into_token_chunks
+
+# Token budget per embedded job text (header + description)
+JOB_TEXT_MAX_TOKENS = int(os.getenv("JOB_TEXT_MAX_TOKENS", "512"))
+# With chunking on, long descriptions are embedded in pieces and the piece vectors are
+# averaged, instead of everything past JOB_TEXT_MAX_TOKENS being cut off
+JOB_TEXT_CHUNKING = os.getenv("JOB_TEXT_CHUNKING", "0") == "1"
+JOB_TEXT_CHUNK_TOKENS = int(os.getenv("JOB_TEXT_CHUNK_TOKENS", "384"))
+JOB_TEXT_MAX_CHUNKS = int(os.getenv("JOB_TEXT_MAX_CHUNKS", "4"))
+
+# Sentences that say nothing about the role itself: EEO statements, benefits blurbs, legal notices
+BOILERPLATE_PATTERN = re.compile(
+    r"equal (?:employment )?opportunity|without regard to|regardless of (?:race|age|gender)"
+    r"|race, colou?r|sexual orientation|gender identity|protected veteran|e-verify"
+    r"|reasonable accommodation|affirmative action|background check|drug[- ]free"
+    r"|benefits (?:include|package)|we offer|what we offer|perks|401\(?k\)?|paid time off|\bpto\b"
+    r"|health, dental|dental and vision|medical, dental|competitive (?:salary|compensation|pay)"
+    r"|pay transparency|salary range|click apply|apply now|privacy (?:policy|notice)",
+    re.IGNORECASE,
+)
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def strip_boilerplate(description: str) -> str:
+    """Drops the sentences of a job description that match BOILERPLATE_PATTERN."""
+    sentences = [sentence.strip() for sentence in SENTENCE_SPLIT.split(description or "")]
+    return " ".join(sentence for sentence in sentences if sentence and not BOILERPLATE_PATTERN.search(sentence))
+
+
+def job_header(job: dict) -> str:
+    return f"""
+    Job Title: {job.get('job_title', '')}
+    Job Publisher: {job.get('job_publisher', '')}
+    Employment Type: {job.get('job_employment_type', '')}
+    Location: {job.get('job_location', '')}
+    """.strip()
+
+
+# The text as it was built before boilerplate stripping and token caps, for the savings stats
+def full_job_text(job: dict) -> str:
+    return f"{job_header(job)}\n    Job Description: {job.get('job_description', '')}"
+
+
+def build_job_text(job: dict, max_tokens: int = JOB_TEXT_MAX_TOKENS) -> str:
+    """Header plus the boilerplate-free description, cut to max_tokens tokens in total."""
+    header = job_header(job)
+    description_budget = max(0, max_tokens - count_tokens(header) - 4)
+    description = truncate_to_tokens(strip_boilerplate(job.get("job_description", "")), description_budget)
+    return f"{header}\n    Job Description: {description}"
+
+
+def build_job_chunks(job: dict, chunk_tokens: int = JOB_TEXT_CHUNK_TOKENS,
+                     max_chunks: int = JOB_TEXT_MAX_CHUNKS) -> list[str]:
+    """The header followed by one piece of the description, for each of up to max_chunks pieces."""
+    header = job_header(job)
+    description_budget = max(1, chunk_tokens - count_tokens(header) - 4)
+    pieces = split_into_token_chunks(strip_boilerplate(job.get("job_description", "")), description_budget)
+    return [f"{header}\n    Job Description: {piece}" for piece in (pieces or [""])[:max_chunks]]
+
+
+def job_text_stats(jobs: list[dict], embedded_texts: list[str]) -> dict:
+    return {
+        "tokens_before": sum(count_tokens(full_job_text(job)) for job in jobs),
+        "tokens_after": sum(count_tokens(text) for text in embedded_texts),
+    }
+
+
+def embed_jobs(jobs: list[dict], chunking: bool = JOB_TEXT_CHUNKING) -> tuple[np.ndarray, dict]:
+    """
+    One unit vector per job (a float32 matrix row), embedded from the token-budgeted job
+    text. With chunking, each job's chunk vectors are averaged into its vector.
+    Returns (vectors, embedding stats plus tokens_before / tokens_after).
+    """
+    if not chunking or not jobs:
+        texts = [build_job_text(job) for job in jobs]
+        vectors, stats = embed_texts(texts, as_matrix=True)
+        return vectors, {**stats, **job_text_stats(jobs, texts)}
+
+    texts, owners = [], []
+    for position, job in enumerate(jobs):
+        chunks = build_job_chunks(job)
+        texts.extend(chunks)
+        owners.extend([position] * len(chunks))
+    matrix, stats = embed_texts(texts, as_matrix=True)
+
+    pooled = np.zeros((len(jobs), matrix.shape[1]), dtype=np.float32)
+    np.add.at(pooled, np.asarray(owners), matrix)
+    return unit_rows(pooled), {**stats, "chunks": len(texts), **job_text_stats(jobs, texts)}
@@ -0,0 +1,108 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+# Okapi BM25 over job texts, kept as an incremental inverted index.
+# Used as a cheap lexical prefilter so only a shortlist of jobs has to be embedded.
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the their this to we
+will with you your job title publisher employment type location description candidate profile
+summary key projects conversation history user assistant
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index (term -> {doc_id: term frequency}) scored with BM25.
+
+    Documents can be added and removed one at a time; corpus statistics (document
+    count, average length, document frequencies) are kept up to date incrementally.
+    With max_docs, the least recently added or touched documents are dropped past that many.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_docs: int = None):
+        self.k1 = k1
+        self.b = b
+        self.max_docs = max_docs
+        self._postings = defaultdict(dict)   # term -> {doc_id: tf}
+        self._doc_terms = OrderedDict()      # doc_id -> Counter of its terms, least recently used first
+        self._doc_lengths = {}               # doc_id -> number of terms
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._doc_terms
+
+    def _remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def add(self, doc_id, text: str):
+        """Indexes text under doc_id, replacing what was indexed under it before."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = sum(terms.values())
+            self._total_length += self._doc_lengths[doc_id]
+            for term, frequency in terms.items():
+                self._postings[term][doc_id] = frequency
+            while self.max_docs is not None and len(self._doc_terms) > self.max_docs:
+                self._remove(next(iter(self._doc_terms)))
+
+    def touch(self, doc_id):
+        """Marks doc_id as recently used so max_docs eviction keeps it."""
+        with self._lock:
+            if doc_id in self._doc_terms:
+                self._doc_terms.move_to_end(doc_id)
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def search(self, query: str, top_n: int, doc_ids=None) -> list[tuple]:
+        """
+        The top_n (doc_id, score) pairs for query, best first. With doc_ids, only those
+        documents are considered. Documents sharing no term with the query are left out.
+        """
+        allowed = set(doc_ids) if doc_ids is not None else None
+        with self._lock:
+            document_count = len(self._doc_terms)
+            if document_count == 0:
+                return []
+            average_length = self._total_length / document_count
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                # Walk whichever is shorter: the term's postings or the allowed documents
+                if allowed is not None and len(allowed) < len(postings):
+                    matches = [(doc_id, postings[doc_id]) for doc_id in allowed if doc_id in postings]
+                else:
+                    matches = [(doc_id, frequency) for doc_id, frequency in postings.items()
+                               if allowed is None or doc_id in allowed]
+                for doc_id, frequency in matches:
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_n]
@@ -0,0 +1,51 @@
+import numpy as np
+
+# Cosine-similarity top-k over float32 matrices.
+# Rows are normalized once, so similarity is a plain matrix product, and top-k uses
+# argpartition (O(n)) before sorting only the k winners.
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Returns a C-contiguous float32 copy of vectors with every row scaled to unit length."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    # einsum sums the squares row by row, without a squared copy of the whole matrix
+    norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+    norms[norms == 0] = 1.0
+    matrix /= norms[:, None]
+    return matrix
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores in each row of scores, best first."""
+    scores = np.atleast_2d(scores)
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(n), (scores.shape[0], 1))
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+def rank_top_k(candidate_matrix, job_matrix, k: int, normalized: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scores every candidate row against every job row and keeps the top k per candidate.
+
+    Pass normalized=True when both matrices already come from normalize_rows, so the
+    (potentially large) job matrix isn't copied again.
+    Returns (indices, scores), both shaped (num_candidates, k).
+    """
+    if not normalized:
+        candidate_matrix = normalize_rows(candidate_matrix)
+        job_matrix = normalize_rows(job_matrix)
+    scores = np.atleast_2d(candidate_matrix) @ job_matrix.T
+    indices = top_k_indices(scores, k)
+    return indices, np.take_along_axis(scores, indices, axis=1)
+
+def recall_at_k(retrieved_ids, exhaustive_ids, k: int) -> float:
+    """Share of the exhaustive top k that also made the retrieved top k."""
+    expected = set(list(exhaustive_ids)[:k])
+    if not expected:
+        return 1.0
+    return len(expected & set(list(retrieved_ids)[:k])) / len(expected)
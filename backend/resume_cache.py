@@ -0,0 +1,28 @@
+import hashlib
+import os
+from agents.cache import CACHE_DIR, SQLiteCache
+from agents.resume_parser import LLM_MODEL, TRADITIONAL_PARSER_VERSION, LLM_PARSER_VERSION, STRUCTURED_PARSER_VERSION
+
+RESUME_CACHE_TTL_SECONDS = int(os.getenv("RESUME_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+RESUME_CACHE_MAX_ENTRIES = int(os.getenv("RESUME_CACHE_MAX_ENTRIES", "5000"))
+
+# Holds both the final reconciled parses and the intermediate traditional parser outputs
+resume_cache = SQLiteCache(
+    os.path.join(CACHE_DIR, "resume_parse.sqlite"),
+    ttl_seconds=RESUME_CACHE_TTL_SECONDS,
+    max_entries=RESUME_CACHE_MAX_ENTRIES,
+)
+
+def document_hash(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest()
+
+# The final result depends on the parse mode, both parsers and the LLM prompts
+def parsed_resume_key(doc_hash: str, country: str, mode: str = "thorough") -> str:
+    if mode == "fast":
+        return f"parsed_fast:{doc_hash}:{country}:{TRADITIONAL_PARSER_VERSION}:{STRUCTURED_PARSER_VERSION}:{LLM_MODEL}"
+    return f"parsed:{doc_hash}:{country}:{TRADITIONAL_PARSER_VERSION}:{LLM_PARSER_VERSION}:{LLM_MODEL}"
+
+# The traditional parse only depends on the document and the spaCy/regex rules,
+# so it survives prompt changes
+def traditional_parse_key(doc_hash: str, country: str) -> str:
+    return f"traditional:{doc_hash}:{country}:{TRADITIONAL_PARSER_VERSION}"
@@ -0,0 +1,133 @@
+import asyncio
+import contextlib
+import os
+import time
+
+from agents.resume_parser import (traditional_resume_parser, allm_resume_parser, areconcile_parsed_outputs,
+                                  astructured_resume_parser)
+from resume_cache import resume_cache, document_hash, parsed_resume_key, traditional_parse_key
+from text_extraction import extract_text
+
+# Bulk ingestion: CPU stages (text extraction, spaCy) run in a process pool sized to the
+# machine; LLM calls are capped separately so a cohort upload doesn't trip rate limits
+BULK_PARSER_WORKERS = int(os.getenv("BULK_PARSER_WORKERS", str(os.cpu_count() or 2)))
+BULK_LLM_MAX_CONCURRENCY = int(os.getenv("BULK_LLM_MAX_CONCURRENCY", "4"))
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "500"))
+
+# "fast": traditional parse, then one structured (function-calling) LLM request.
+# "thorough": LLM parse alongside the traditional one, then an LLM reconciliation.
+RESUME_PARSE_MODES = ("fast", "thorough")
+RESUME_PARSE_MODE = os.getenv("RESUME_PARSE_MODE", "fast")
+
+
+# Awaits an awaitable and returns its result along with how long it took in seconds
+async def timed(awaitable):
+    start = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - start
+
+
+async def aparse_resume_document(contents: bytes, filename: str, country: str, executor,
+                                 llm_semaphore: asyncio.Semaphore = None,
+                                 mode: str = RESUME_PARSE_MODE) -> tuple[dict, dict]:
+    """
+    Full parse of one uploaded resume: cache lookup, text extraction, then the parsers of
+    the given mode (see RESUME_PARSE_MODES).
+
+    Extraction and the traditional parser run in executor; every LLM call waits on
+    llm_semaphore when one is given. Returns (parsed_resume, stage timings in seconds).
+    parsed_resume holds an "error" key when the final LLM stage failed. Results are only
+    cached when every LLM stage succeeded.
+    Raises UnsupportedFileType for anything but PDF/DOCX.
+    """
+    request_start = time.perf_counter()
+    timings = {}
+    llm_slot = llm_semaphore if llm_semaphore is not None else contextlib.nullcontext()
+
+    # Same document and country as before: return the reconciled parse straight away
+    doc_hash = document_hash(contents)
+    cached_resume = await resume_cache.aget(parsed_resume_key(doc_hash, country, mode))
+    if cached_resume is not None:
+        timings["cache_hit"] = time.perf_counter() - request_start
+        return cached_resume, timings
+
+    loop = asyncio.get_running_loop()
+    text, timings["extract"] = await timed(loop.run_in_executor(executor, extract_text, contents, filename))
+
+    # The traditional output is cached on its own so prompt changes only re-run the LLM stages
+    traditional_key = traditional_parse_key(doc_hash, country)
+    traditional_data = await resume_cache.aget(traditional_key)
+
+    if mode == "fast":
+        if traditional_data is None:
+            traditional_data, timings["traditional"] = await timed(
+                loop.run_in_executor(executor, traditional_resume_parser, text, country))
+            await resume_cache.aset(traditional_key, traditional_data)
+        async with llm_slot:
+            parsed_resume, timings["structured_parse"] = await timed(
+                astructured_resume_parser(text, traditional_data, country))
+        if "error" not in parsed_resume:
+            await resume_cache.aset(parsed_resume_key(doc_hash, country, mode), parsed_resume)
+        timings["total"] = time.perf_counter() - request_start
+        return parsed_resume, timings
+
+    async def llm_parse():
+        async with llm_slot:
+            return await allm_resume_parser(text, country)
+
+    # The traditional and LLM parsers don't depend on each other, so they run side by side
+    parallel_start = time.perf_counter()
+    if traditional_data is None:
+        (traditional_data, timings["traditional"]), (llm_data, timings["llm_parse"]) = await asyncio.gather(
+            timed(loop.run_in_executor(executor, traditional_resume_parser, text, country)),
+            timed(llm_parse()),
+        )
+        await resume_cache.aset(traditional_key, traditional_data)
+    else:
+        llm_data, timings["llm_parse"] = await timed(llm_parse())
+    timings["parse_parallel"] = time.perf_counter() - parallel_start
+
+    # Reconcile the two using LLM
+    async with llm_slot:
+        parsed_resume, timings["reconcile"] = await timed(areconcile_parsed_outputs(traditional_data, llm_data))
+
+    # Failed LLM stages are not cached so the next attempt retries them
+    if "error" not in llm_data and "error" not in parsed_resume:
+        await resume_cache.aset(parsed_resume_key(doc_hash, country, mode), parsed_resume)
+
+    timings["total"] = time.perf_counter() - request_start
+    return parsed_resume, timings
+
+
+# Parses every document of a bulk upload (zips already expanded by expand_uploads) concurrently
+# and yields one result per document in completion order. A failed document never fails the batch.
+async def aingest_resumes(documents: list[tuple[str, bytes]], country: str, executor,
+                          llm_max_concurrency: int = BULK_LLM_MAX_CONCURRENCY, mode: str = RESUME_PARSE_MODE):
+    llm_semaphore = asyncio.Semaphore(max(1, llm_max_concurrency))
+
+    async def ingest(index: int, filename: str, contents: bytes):
+        result = {"index": index, "filename": filename}
+        if contents is None:
+            return {**result, "status": "error", "error": "Unreadable, encrypted or oversized archive entry"}
+        try:
+            parsed_resume, timings = await aparse_resume_document(contents, filename, country, executor, llm_semaphore, mode)
+        except Exception as e:
+            return {**result, "status": "error", "error": str(e)}
+        if "error" in parsed_resume:
+            return {**result, "status": "error", "error": parsed_resume["error"]}
+        return {
+            **result,
+            "status": "ok",
+            "cached": "cache_hit" in timings,
+            "seconds": round(timings.get("total", timings.get("cache_hit", 0.0)), 3),
+            "resume": parsed_resume,
+        }
+
+    tasks = [asyncio.create_task(ingest(i, name, contents)) for i, (name, contents) in enumerate(documents)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # The client went away: stop parsing what nobody will read
+        for task in tasks:
+            task.cancel()
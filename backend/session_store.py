@@ -0,0 +1,219 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from agents.cache import CACHE_DIR
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+SESSION_MEMORY_ITEMS = int(os.getenv("SESSION_MEMORY_ITEMS", "1000"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "20000"))
+# "sqlite" keeps sessions across restarts, "memory" keeps them in this process only
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+
+
+def new_session() -> dict:
+    # memory is the ConversationMemory state (summary of older chat turns)
+    return {"resume_summary": None, "country": None, "chat_history": [], "jobs": [], "memory": None}
+
+
+class SQLiteSessionBackend:
+    """
+    Persistent tier for sessions, with each kind of state in its own table so a write only
+    touches what changed: small fields (resume summary, country, memory) as one JSON row,
+    the retrieved jobs as another, and chat turns as one row per turn, appended.
+
+    A session expires ttl_seconds after its last write; past max_entries sessions the
+    least recently written ones are dropped.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " fields TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS session_jobs (id TEXT PRIMARY KEY, jobs TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_chat ("
+            " id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " turn TEXT NOT NULL,"
+            " PRIMARY KEY (id, seq))"
+        )
+        self._conn.commit()
+
+    def load(self, session_id: str):
+        """(full session dict, time of its last write), or None if it doesn't exist or has expired."""
+        with self._lock:
+            row = self._conn.execute("SELECT fields, updated_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[1] > self.ttl_seconds:
+                self._delete([session_id])
+                self._conn.commit()
+                return None
+            session = new_session()
+            session.update(json.loads(row[0]))
+            jobs = self._conn.execute("SELECT jobs FROM session_jobs WHERE id = ?", (session_id,)).fetchone()
+            session["jobs"] = json.loads(jobs[0]) if jobs else []
+            session["chat_history"] = [json.loads(turn) for (turn,) in self._conn.execute(
+                "SELECT turn FROM session_chat WHERE id = ? ORDER BY seq", (session_id,))]
+        return session, row[1]
+
+    def save_fields(self, session_id: str, fields: dict):
+        """Writes the given fields of a session; the ones not given are left as stored."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT fields FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            small = json.loads(row[0]) if row else {}
+            small.update({key: value for key, value in fields.items() if key not in ("jobs", "chat_history")})
+            self._conn.execute("INSERT OR REPLACE INTO sessions (id, fields, updated_at) VALUES (?, ?, ?)",
+                               (session_id, json.dumps(small), now))
+            if "jobs" in fields:
+                self._conn.execute("INSERT OR REPLACE INTO session_jobs (id, jobs) VALUES (?, ?)",
+                                   (session_id, json.dumps(fields["jobs"])))
+            if "chat_history" in fields:
+                self._conn.execute("DELETE FROM session_chat WHERE id = ?", (session_id,))
+                self._insert_turns(session_id, fields["chat_history"], 0)
+            self._evict(now)
+            self._conn.commit()
+
+    def append_chat(self, session_id: str, turns: list[dict], start: int):
+        """Stores turns as chat messages start, start + 1, ... of the session."""
+        now = time.time()
+        with self._lock:
+            touched = self._conn.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (now, session_id)).rowcount
+            # An evicted session keeps no orphan turns
+            if touched:
+                self._insert_turns(session_id, turns, start)
+            self._conn.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._delete([session_id])
+            self._conn.commit()
+
+    def _insert_turns(self, session_id: str, turns: list[dict], start: int):
+        self._conn.executemany("INSERT OR REPLACE INTO session_chat (id, seq, turn) VALUES (?, ?, ?)",
+                               [(session_id, start + i, json.dumps(turn)) for i, turn in enumerate(turns)])
+
+    def _delete(self, session_ids: list[str]):
+        for table in ("sessions", "session_jobs", "session_chat"):
+            self._conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(session_id,) for session_id in session_ids])
+
+    def _evict(self, now: float):
+        expired = [row[0] for row in self._conn.execute(
+            "SELECT id FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))]
+        overflow = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - len(expired) - self.max_entries
+        if overflow > 0:
+            expired += [row[0] for row in self._conn.execute(
+                "SELECT id FROM sessions WHERE updated_at >= ? ORDER BY updated_at LIMIT ?",
+                (now - self.ttl_seconds, overflow))]
+        if expired:
+            self._delete(expired)
+
+
+class SessionStore:
+    """
+    Server-side state for one user session: resume summary, chat history and retrieved jobs.
+
+    Sessions live in an in-memory LRU tier and are written through to an optional
+    persistent tier (SQLiteSessionBackend), which only receives what changed: updated
+    fields, or the new chat turns. Both tiers expire a session ttl_seconds after its
+    last write. The methods do blocking I/O; call them from a threadpool in async code.
+    """
+
+    def __init__(self, persistent=None, memory_items: int = SESSION_MEMORY_ITEMS,
+                 ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.persistent = persistent
+        self.memory_items = memory_items
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()   # session_id -> (session, time of the last write)
+        self._lock = threading.Lock()
+
+    def _remember(self, session_id: str, session: dict, written_at: float):
+        self._memory[session_id] = (session, written_at)
+        self._memory.move_to_end(session_id)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def create(self, **fields) -> str:
+        session_id = uuid.uuid4().hex
+        session = new_session()
+        session.update(fields)
+        self.save(session_id, session)
+        return session_id
+
+    def get(self, session_id: str):
+        """Returns the session dict, or None if it doesn't exist or has expired."""
+        with self._lock:
+            entry = self._memory.get(session_id)
+            if entry is not None:
+                session, written_at = entry
+                if time.time() - written_at <= self.ttl_seconds:
+                    self._memory.move_to_end(session_id)
+                    return session
+                del self._memory[session_id]
+        if self.persistent is None:
+            return None
+        loaded = self.persistent.load(session_id)
+        if loaded is None:
+            return None
+        session, written_at = loaded
+        with self._lock:
+            self._remember(session_id, session, written_at)
+        return session
+
+    def save(self, session_id: str, session: dict, fields=None):
+        """Stores session; with fields, only those keys are written to the persistent tier."""
+        with self._lock:
+            self._remember(session_id, session, time.time())
+        if self.persistent is not None:
+            self.persistent.save_fields(session_id, session if fields is None else {key: session[key] for key in fields})
+
+    def update(self, session_id: str, **fields):
+        session = self.get(session_id)
+        if session is None:
+            return None
+        session.update(fields)
+        self.save(session_id, session, fields)
+        return session
+
+    def append_chat(self, session_id: str, turns: list[dict]):
+        session = self.get(session_id)
+        if session is None:
+            return None
+        start = len(session["chat_history"])
+        session["chat_history"].extend(turns)
+        with self._lock:
+            self._remember(session_id, session, time.time())
+        if self.persistent is not None:
+            self.persistent.append_chat(session_id, turns, start)
+        return session
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._memory.pop(session_id, None)
+        if self.persistent is not None:
+            self.persistent.delete(session_id)
+
+
+session_store = SessionStore(
+    persistent=SQLiteSessionBackend(
+        os.path.join(CACHE_DIR, "sessions.sqlite"),
+        ttl_seconds=SESSION_TTL_SECONDS,
+        max_entries=SESSION_MAX_ENTRIES,
+    ) if SESSION_BACKEND == "sqlite" else None
+)
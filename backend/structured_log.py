@@ -0,0 +1,40 @@
+import json
+import logging
+import os
+import random
+
+# Fraction of routine (below WARNING) events that are actually written
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+# Longest string value kept in a log line; anything longer is truncated
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "200"))
+
+logger = logging.getLogger("smartintern")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+    logger.propagate = False
+
+def cap_field(value, max_chars: int = LOG_MAX_FIELD_CHARS):
+    """Keeps numbers and booleans as they are, and truncates everything else to max_chars."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}...(+{len(text) - max_chars} chars)"
+
+def log_event(event: str, level: int = logging.INFO, sample_rate: float = LOG_SAMPLE_RATE, **fields):
+    """
+    Writes one JSON log line. Routine events are sampled at sample_rate;
+    warnings and errors are always written.
+    """
+    if level < logging.WARNING and random.random() >= sample_rate:
+        return
+    if not logger.isEnabledFor(level):
+        return
+
+    record = {"event": event, "level": logging.getLevelName(level)}
+    record.update({key: cap_field(value) for key, value in fields.items()})
+    logger.log(level, json.dumps(record))
@@ -0,0 +1,87 @@
+import io
+import os
+import zipfile
+import zlib
+
+from agents.lazy_loading import load_once
+
+SUPPORTED_FILE_TYPES = {"pdf", "docx", "doc"}
+# Members of an uploaded zip larger than this are rejected instead of being inflated
+MAX_EXTRACTED_FILE_BYTES = int(os.getenv("MAX_EXTRACTED_FILE_BYTES", str(20 * 1024 * 1024)))
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+class TooManyDocuments(ValueError):
+    pass
+
+
+# PyMuPDF and docx2txt are only imported once a document is actually read
+@load_once("fitz")
+def get_fitz():
+    import fitz
+    return fitz
+
+@load_once("docx2txt")
+def get_docx2txt():
+    import docx2txt
+    return docx2txt
+
+
+def file_type(filename: str) -> str:
+    return filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+
+def extract_text(contents: bytes, filename: str) -> str:
+    """Raw text of a PDF or DOCX document, read straight from its bytes."""
+    kind = file_type(filename)
+    if kind == "pdf":
+        with get_fitz().open(stream=contents, filetype="pdf") as doc:
+            return "\n".join([page.get_text() for page in doc])
+    if kind in ("docx", "doc"):
+        # docx2txt reads the zip container from any file-like object, so no temp file is needed
+        return get_docx2txt().process(io.BytesIO(contents))
+    raise UnsupportedFileType(f"Unsupported file type: {filename}")
+
+
+def expand_uploads(uploads: list[tuple[str, bytes]], max_documents: int = None) -> list[tuple[str, bytes]]:
+    """
+    Replaces every .zip upload with the documents inside it, keeping the upload order.
+    Members are named "archive.zip/path/in/archive". Folders and macOS metadata are skipped;
+    an unreadable archive, or a member that is oversized, encrypted, corrupt or uses an
+    unsupported compression method, is kept with None contents so it is reported as a failure.
+    Raises TooManyDocuments as soon as there are more than max_documents documents.
+    """
+    documents = []
+
+    def add(name: str, contents):
+        if max_documents is not None and len(documents) >= max_documents:
+            raise TooManyDocuments(f"At most {max_documents} documents per bulk upload")
+        documents.append((name, contents))
+
+    for filename, contents in uploads:
+        if file_type(filename) != "zip":
+            add(filename, contents)
+            continue
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(contents))
+        except zipfile.BadZipFile:
+            add(filename, None)
+            continue
+        with archive:
+            for member in archive.infolist():
+                if member.is_dir() or member.filename.startswith("__MACOSX/"):
+                    continue
+                name = f"{filename}/{member.filename}"
+                if member.file_size > MAX_EXTRACTED_FILE_BYTES:
+                    add(name, None)
+                    continue
+                try:
+                    member_contents = archive.read(member)
+                except (RuntimeError, NotImplementedError, zipfile.BadZipFile, zlib.error, EOFError):
+                    # Encrypted (RuntimeError), unsupported compression method, or corrupt data
+                    member_contents = None
+                add(name, member_contents)
+    return documents
@@ -1,24 +1,101 @@
-import faiss
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
 import numpy as np
-from agents.embed import get_embeddings
-from langchain.schema import Document
-from langchain_community.docstore.in_memory import InMemoryDocstore
-from langchain_community.vectorstores import FAISS
+from agents.cache import CACHE_DIR
+from agents.embed import get_embeddings, embed_texts
+from agents.lazy_loading import load_once
+from ranking import normalize_rows
+
+# Where the job corpus index and its metadata are persisted
+JOB_INDEX_DIR = os.getenv("JOB_INDEX_DIR", os.path.join(CACHE_DIR, "job_index"))
+# Past this many jobs the exact flat index is rebuilt as an approximate one
+JOB_INDEX_ANN_THRESHOLD = int(os.getenv("JOB_INDEX_ANN_THRESHOLD", "20000"))
+# "hnsw" (no training, good recall) or "ivf" (smaller, needs training)
+JOB_INDEX_ANN_TYPE = os.getenv("JOB_INDEX_ANN_TYPE", "hnsw")
+JOB_INDEX_HNSW_M = int(os.getenv("JOB_INDEX_HNSW_M", "32"))
+JOB_INDEX_SAVE_INTERVAL_SECONDS = float(os.getenv("JOB_INDEX_SAVE_INTERVAL_SECONDS", "60"))
+# How job vectors are stored in the index: "float32", "float16" (half the memory) or "int8"
+# (a quarter). Quantized indexes score the stored codes directly, nothing is decoded up front.
+JOB_INDEX_DTYPE = os.getenv("JOB_INDEX_DTYPE", "float16")
+# int8 ranges are trained on the corpus, so an int8 index stays exact float32 until it has this many jobs
+JOB_INDEX_INT8_TRAIN_SIZE = int(os.getenv("JOB_INDEX_INT8_TRAIN_SIZE", "1000"))
+
+
+# faiss (and langchain, below) are imported on first use to keep backend startup fast
+@load_once("faiss")
+def get_faiss():
+    import faiss
+    return faiss
+
+
+def stable_job_id(job: dict) -> int:
+    """
+    63-bit ID that stays the same every time JSearch returns the same posting:
+    its job_id if present, else its apply link, else title/publisher/location.
+    """
+    key = job.get("job_id") or job.get("job_apply_link") or "|".join(
+        str(job.get(field) or "") for field in ("job_title", "job_publisher", "job_location")
+    )
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big") & 0x7FFFFFFFFFFFFFFF
+
+
+def scalar_quantizer_type(dtype: str):
+    faiss = get_faiss()
+    return {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}.get(dtype)
+
+
+def is_flat_index(index) -> bool:
+    faiss = get_faiss()
+    return isinstance(index, (faiss.IndexFlat, faiss.IndexScalarQuantizer))
 
 
 class VectorDatabase:
-    def __init__(self):
+    def __init__(self, index_dir: str = JOB_INDEX_DIR, dtype: str = JOB_INDEX_DTYPE):
         self.vector_store = None  # This will hold the FAISS index
+        self.dtype = dtype
+
+        # Persistent corpus of every job seen so far: a FAISS index over normalized
+        # job vectors (inner product == cosine similarity), keyed by stable_job_id,
+        # plus a SQLite table with the job dicts
+        self.index_dir = index_dir
+        self.index_path = os.path.join(index_dir, "jobs.faiss")
+        self.job_index = None
+        self._indexed_ids = set()
+        self._index_is_mmapped = False
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._lock = threading.RLock()
+
+        os.makedirs(index_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(index_dir, "jobs.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY,"
+            " job TEXT NOT NULL,"
+            " country TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_country ON jobs (country)")
+        self._db.commit()
+        self.load()
 
     def create_vector_store(self, chunks: list[str], metadatas:list[dict]):
         """Creates and stores the FAISS vector database"""
-        
+        from langchain.schema import Document
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+        faiss = get_faiss()
+
         print(f"Inside create_vector_store: {len(chunks)} chunks", flush=True)
         print(chunks)
-        embeddings = get_embeddings(chunks)
+        embeddings, embedding_stats = embed_texts(chunks)
         dimension = len(embeddings[0])
-        
-        print(len(embeddings), flush=True)
+
+        print(f"{len(embeddings)} embeddings in {embedding_stats['batch_count']} batches", flush=True)
         # Create FAISS index
         faiss_index = faiss.IndexFlatL2(dimension)
         faiss_index.add(np.array(embeddings, dtype=np.float32))
@@ -38,4 +115,226 @@ class VectorDatabase:
             docstore=docstore,
             index_to_docstore_id=index_to_docstore_id,
             embedding_function=get_embeddings,
-        )
\ No newline at end of file
+        )
+
+    # ------------------------------------------------------------------ job corpus
+
+    def load(self):
+        """
+        Memory-maps the saved job index, so startup doesn't read it all into RAM.
+
+        IO_FLAG_MMAP_IFC maps the stored vectors of flat, scalar-quantized and HNSW indexes
+        alike (plain IO_FLAG_MMAP only maps IVF lists). faiss builds without it load the
+        index into memory once instead.
+        """
+        with self._lock:
+            if not os.path.exists(self.index_path):
+                return
+            faiss = get_faiss()
+            mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+            try:
+                if mmap_flag is None:
+                    self.job_index = faiss.read_index(self.index_path)
+                else:
+                    self.job_index = faiss.read_index(self.index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+                self._indexed_ids = set(faiss.vector_to_array(self.job_index.id_map).tolist())
+                self._index_is_mmapped = mmap_flag is not None
+            except Exception as e:
+                print(f"Could not load job index from {self.index_path}: {e}", flush=True)
+                self.job_index = None
+
+    def save(self):
+        with self._lock:
+            if self.job_index is None or not self._dirty:
+                return
+            tmp_path = self.index_path + ".tmp"
+            get_faiss().write_index(self.job_index, tmp_path)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    def save_if_due(self):
+        if self._dirty and time.monotonic() - self._last_save >= JOB_INDEX_SAVE_INTERVAL_SECONDS:
+            self.save()
+
+    def __len__(self):
+        return 0 if self.job_index is None else self.job_index.ntotal
+
+    # Checked against the index itself rather than the metadata table, so jobs whose
+    # vectors were lost in an unsaved index are embedded again
+    def known_ids(self, ids: list[int]) -> set[int]:
+        return {job_id for job_id in ids if job_id in self._indexed_ids}
+
+    def _new_flat_index(self, dimension: int):
+        faiss = get_faiss()
+        if self.dtype == "float16":
+            return faiss.IndexScalarQuantizer(dimension, scalar_quantizer_type("float16"), faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexFlatIP(dimension)
+
+    def _writable_index(self, dimension: int):
+        faiss = get_faiss()
+        if self.job_index is not None and self.job_index.d != dimension:
+            # EMBEDDING_DIMENSIONS changed: old vectors can't be compared with new ones, so start over
+            print(f"Job index holds {self.job_index.d}-dim vectors, got {dimension}: starting a new index", flush=True)
+            self.job_index = None
+            self._indexed_ids = set()
+            self._index_is_mmapped = False
+        if self.job_index is None:
+            self.job_index = faiss.IndexIDMap2(self._new_flat_index(dimension))
+        elif self._index_is_mmapped:
+            # Mapped vectors can't grow (adding to them aborts inside faiss): the first write
+            # swaps the mapping for one private copy, read from the file the mapping came from
+            self.job_index = faiss.read_index(self.index_path)
+            self._index_is_mmapped = False
+        return self.job_index
+
+    def _maybe_quantize(self):
+        """Rebuilds an exact int8-pending index as int8 once there are enough jobs to train its ranges."""
+        faiss = get_faiss()
+        inner = faiss.downcast_index(self.job_index.index)
+        if (self.dtype != "int8" or not isinstance(inner, faiss.IndexFlat)
+                or not JOB_INDEX_INT8_TRAIN_SIZE <= self.job_index.ntotal < JOB_INDEX_ANN_THRESHOLD):
+            return
+
+        ids = faiss.vector_to_array(self.job_index.id_map).astype(np.int64)
+        vectors = inner.reconstruct_n(0, inner.ntotal)
+        quantized = faiss.IndexScalarQuantizer(vectors.shape[1], scalar_quantizer_type("int8"), faiss.METRIC_INNER_PRODUCT)
+        quantized.train(vectors)
+        rebuilt = faiss.IndexIDMap2(quantized)
+        rebuilt.add_with_ids(vectors, ids)
+        self.job_index = rebuilt
+        print(f"Job index quantized to int8 at {len(ids)} jobs", flush=True)
+
+    def _maybe_upgrade_to_ann(self):
+        faiss = get_faiss()
+        inner = faiss.downcast_index(self.job_index.index)
+        if not is_flat_index(inner) or self.job_index.ntotal < JOB_INDEX_ANN_THRESHOLD:
+            return
+
+        ids = faiss.vector_to_array(self.job_index.id_map).astype(np.int64)
+        vectors = inner.reconstruct_n(0, inner.ntotal)
+        dimension = vectors.shape[1]
+        qtype = scalar_quantizer_type(self.dtype)
+
+        if JOB_INDEX_ANN_TYPE == "ivf":
+            nlist = max(1, int(4 * np.sqrt(len(ids))))
+            coarse = faiss.IndexFlatIP(dimension)
+            if qtype is None:
+                ann = faiss.IndexIVFFlat(coarse, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            else:
+                ann = faiss.IndexIVFScalarQuantizer(coarse, dimension, nlist, qtype, faiss.METRIC_INNER_PRODUCT)
+            ann.train(vectors)
+            ann.nprobe = max(1, nlist // 16)
+        elif qtype is None:
+            ann = faiss.IndexHNSWFlat(dimension, JOB_INDEX_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        else:
+            ann = faiss.IndexHNSWSQ(dimension, qtype, JOB_INDEX_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            ann.train(vectors)
+
+        upgraded = faiss.IndexIDMap2(ann)
+        upgraded.add_with_ids(vectors, ids)
+        self.job_index = upgraded
+        print(f"Job index upgraded to {JOB_INDEX_ANN_TYPE} ({self.dtype}) at {len(ids)} jobs", flush=True)
+
+    def upsert_jobs(self, jobs: list[dict], vectors: list[list[float]] = None, job_texts: list[str] = None,
+                    country: str = None) -> list[int]:
+        """
+        Adds jobs to the corpus, skipping postings that are already indexed.
+
+        Pass vectors when they are already at hand; otherwise only the jobs that are new
+        to the corpus are embedded (from job_texts). Returns the stable ID of every job.
+        """
+        ids = [stable_job_id(job) for job in jobs]
+        now = time.time()
+
+        with self._lock:
+            known = self.known_ids(list(set(ids)))
+            new_positions, seen = [], set(known)
+            for position, job_id in enumerate(ids):
+                if job_id not in seen:
+                    seen.add(job_id)
+                    new_positions.append(position)
+
+            if new_positions:
+                if vectors is not None:
+                    new_vectors = [vectors[i] for i in new_positions]
+                else:
+                    new_vectors, _ = embed_texts([job_texts[i] for i in new_positions])
+                matrix = normalize_rows(new_vectors)
+                index = self._writable_index(matrix.shape[1])
+                index.add_with_ids(matrix, np.array([ids[i] for i in new_positions], dtype=np.int64))
+                self._indexed_ids.update(ids[i] for i in new_positions)
+                self._maybe_quantize()
+                self._maybe_upgrade_to_ann()
+                self._dirty = True
+
+            # Metadata is refreshed for every job so reposted jobs keep their latest details
+            self._db.executemany(
+                "INSERT OR REPLACE INTO jobs (id, job, country, updated_at) VALUES (?, ?, ?, ?)",
+                [(job_id, json.dumps(job), country, now) for job_id, job in zip(ids, jobs)],
+            )
+            self._db.commit()
+
+        return ids
+
+    def _country_selector(self, country: str):
+        """Selects the indexed jobs of country, plus those stored without one."""
+        ids = np.array([row[0] for row in self._db.execute(
+            "SELECT id FROM jobs WHERE country = ? OR country IS NULL", (country,)
+        )], dtype=np.int64)
+        return get_faiss().IDSelectorBatch(ids) if len(ids) else None
+
+    def _search_parameters(self, selector, widen: int) -> tuple:
+        """
+        (search parameters restricted to selector, whether they already search everything).
+        Approximate indexes look widen times further than usual, so a rare country still fills top_k.
+        """
+        faiss = get_faiss()
+        inner = faiss.downcast_index(self.job_index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            ef_search = min(self.job_index.ntotal, inner.hnsw.efSearch * widen)
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search), ef_search >= self.job_index.ntotal
+        if isinstance(inner, faiss.IndexIVF):
+            nprobe = min(inner.nlist, inner.nprobe * widen)
+            return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe), nprobe >= inner.nlist
+        return faiss.SearchParameters(sel=selector), True
+
+    def search_jobs(self, candidate_vector, top_k: int, country: str = None) -> list[tuple[dict, float]]:
+        """Returns the top_k (job_dict, cosine similarity) pairs in the corpus, optionally for one country."""
+        query = normalize_rows(np.asarray(candidate_vector, dtype=np.float32).reshape(1, -1))
+        selector = None
+        if country:
+            # Jobs of other countries are filtered out inside the index search
+            selector = self._country_selector(country)
+            if selector is None:
+                return []
+
+        widen = 1
+        while True:
+            with self._lock:
+                if self.job_index is None or self.job_index.ntotal == 0:
+                    return []
+                if query.shape[1] != self.job_index.d:
+                    print(f"Candidate vector has {query.shape[1]} dims, the job index {self.job_index.d}", flush=True)
+                    return []
+                fetch_k = min(self.job_index.ntotal, top_k)
+                if selector is None:
+                    scores, ids = self.job_index.search(query, fetch_k)
+                    exhausted = True
+                else:
+                    params, exhausted = self._search_parameters(selector, widen)
+                    scores, ids = self.job_index.search(query, fetch_k, params=params)
+
+            hits = [(int(job_id), float(score)) for job_id, score in zip(ids[0], scores[0]) if job_id != -1]
+            if len(hits) >= fetch_k or exhausted:
+                return self._jobs_for_hits(hits)
+            widen *= 4
+
+    def _jobs_for_hits(self, hits: list[tuple[int, float]]) -> list[tuple[dict, float]]:
+        if not hits:
+            return []
+        placeholders = ",".join("?" * len(hits))
+        jobs_by_id = dict(self._db.execute(
+            f"SELECT id, job FROM jobs WHERE id IN ({placeholders})", [job_id for job_id, _ in hits]
+        ).fetchall())
+        return [(json.loads(jobs_by_id[job_id]), score) for job_id, score in hits if job_id in jobs_by_id]
@@ -0,0 +1,182 @@
+"""
+Micro-benchmarks of the backend's pure-CPU hot paths, on synthetic fixtures (no network):
+
+- PDF / DOCX text extraction as /parse_resume/ does it (text_extraction.extract_text)
+- segment_resume, extract_section and traditional_resume_parser
+- build_job_texts and combine_summary_and_chat
+- rank_jobs_by_similarity at 10, 1k and 100k jobs, on unit float32 rows as filter_jobs passes them
+
+Each case reports the median time per call over --runs runs, throughput (items per second) and the
+peak memory of one run as seen by tracemalloc (Python and numpy allocations; memory held
+inside C libraries such as MuPDF is not counted). Save a run and compare later ones to it:
+
+    python benchmarks/bench_cpu_paths.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_cpu_paths.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+With --baseline, the exit status is 1 when a case is slower or uses more memory than the
+baseline by more than the tolerance, so the suite can gate a CI job on the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "backend"))
+# The backend opens its caches and stores on import; keep them away from real data
+os.environ.setdefault("SMARTINTERN_CACHE_DIR", tempfile.mkdtemp(prefix="smartintern-bench-"))
+
+from agents.resume_parser import extract_section, segment_resume, traditional_resume_parser, get_nlp
+from app_backend import build_job_texts, combine_summary_and_chat, rank_jobs_by_similarity
+from ranking import normalize_rows
+from text_extraction import extract_text
+from benchmarks.fixtures import (synthetic_resume, synthetic_pdf, synthetic_docx, synthetic_jobs,
+                                 synthetic_resume_summary, synthetic_chat, synthetic_vectors)
+
+
+def build_cases(args) -> list[tuple[str, int, callable]]:
+    """
+    (name, items processed per call, setup) for every case. setup() builds the fixture and
+    returns the zero-argument function to time, so fixtures only exist while their case runs.
+    """
+    cases = []
+    for pages in args.pages:
+        text = synthetic_resume(pages)
+        # A first line that isn't a name sends the header through spaCy NER
+        ner_text = "Curriculum vitae of a candidate seeking roles\n" + text
+        cases += [
+            (f"extract_text_pdf[{pages}p]", 1,
+             lambda text=text: (lambda pdf=synthetic_pdf(text): extract_text(pdf, "resume.pdf"))),
+            (f"extract_text_docx[{pages}p]", 1,
+             lambda text=text: (lambda docx=synthetic_docx(text): extract_text(docx, "resume.docx"))),
+            (f"segment_resume[{pages}p]", 1, lambda text=text: lambda: segment_resume(text)),
+            (f"extract_section[{pages}p]", 1, lambda text=text: lambda: extract_section(
+                text, ["skills", "technical skills"], ["experience", "projects", "education"])),
+            (f"traditional_resume_parser[{pages}p]", 1, lambda text=text: lambda: traditional_resume_parser(text, "India")),
+        ]
+        if args.ner:
+            cases.append((f"traditional_resume_parser_ner[{pages}p]", 1,
+                          lambda ner_text=ner_text: lambda: traditional_resume_parser(ner_text, "India")))
+
+    for count in args.text_jobs:
+        cases.append((f"build_job_texts[{count}]", count,
+                      lambda count=count: (lambda jobs=synthetic_jobs(count): build_job_texts(jobs))))
+
+    resume_summary = synthetic_resume_summary()
+    for turns in args.turns:
+        cases.append((f"combine_summary_and_chat[{turns}t]", 1, lambda turns=turns: (
+            lambda chat_history=synthetic_chat(turns): combine_summary_and_chat(resume_summary, chat_history))))
+
+    # Job vectors are normalized when they are embedded (or read from the cache), not per request
+    candidate = normalize_rows(synthetic_vectors(1, args.dims, seed=1))
+    for count in args.rank_jobs:
+        def setup(count=count):
+            job_vectors = normalize_rows(synthetic_vectors(count, args.dims))
+            jobs = [{"job_id": str(i)} for i in range(count)]
+            return lambda: rank_jobs_by_similarity(candidate, job_vectors, jobs, args.top_k, normalized=True)
+        cases.append((f"rank_jobs_by_similarity[{count}]", count, setup))
+    return cases
+
+
+def measure(function, runs: int) -> tuple[float, int]:
+    """
+    (median seconds per call, peak traced bytes of one call). Each of the runs calls function
+    as many times as it takes to fill 0.2 s (timeit's autorange, which also warms it up), so
+    sub-millisecond cases aren't dominated by timer noise.
+    """
+    timer = timeit.Timer(function)
+    loops, _ = timer.autorange()
+    durations = [total / loops for total in timer.repeat(repeat=runs, number=loops)]
+
+    # Memory is traced in a separate call since tracing slows everything down
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(durations), peak
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Names (with the reason) of the cases that regressed past tolerance."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        if result["seconds"] > previous["seconds"] * (1 + tolerance):
+            regressions.append(f"{name}: {result['seconds'] / previous['seconds']:.2f}x slower")
+        if result["peak_mb"] > previous["peak_mb"] * (1 + tolerance) + 0.1:
+            regressions.append(f"{name}: {result['peak_mb'] / max(previous['peak_mb'], 1e-9):.2f}x the memory")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 10])
+    parser.add_argument("--text-jobs", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--rank-jobs", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--dims", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--only", help="run only the cases whose name contains this")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / memory growth (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    try:
+        get_nlp()
+        args.ner = True
+    except Exception as e:
+        print(f"spaCy model unavailable, skipping the NER cases: {e}", flush=True)
+        args.ner = False
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    print(f"{'case':<38} {'ms / call':>10} {'items / s':>12} {'peak MB':>9}" + (f" {'vs baseline':>12}" if baseline else ""))
+    for name, items, setup in build_cases(args):
+        if args.only and args.only not in name:
+            continue
+        seconds, peak = measure(setup(), args.runs)
+        results[name] = {"seconds": seconds, "per_second": items / seconds if seconds else 0.0, "peak_mb": peak / 2**20}
+        line = f"{name:<38} {seconds * 1000:>10.3f} {results[name]['per_second']:>12.1f} {peak / 2**20:>9.2f}"
+        previous = baseline and baseline.get("results", {}).get(name)
+        if previous:
+            line += f" {seconds / previous['seconds']:>11.2f}x"
+        print(line, flush=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "runs": args.runs,
+                "dims": args.dims,
+                "results": results,
+            }, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
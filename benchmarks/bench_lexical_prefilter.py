@@ -0,0 +1,158 @@
+"""
+Offline recall@k of the BM25 prefilter (LEXICAL_PREFILTER_DEPTH).
+
+For every job count and shortlist depth, ranks the jobs by dense similarity twice, once over
+all of them and once over the lexical_shortlist only, the way filter_jobs does, and reports
+the share of the exhaustive top k the shortlisted ranking still finds (what the sampled
+"prefilter_recall" event logs in production). Without --depth, each job count is shortlisted
+at the depth the backend would use for it (prefilter_depth: LEXICAL_PREFILTER_DEPTH, or
+LEXICAL_PREFILTER_FRACTION of the jobs when that is more).
+
+By default jobs and candidates are synthetic (no network): texts drawn from a handful of
+topic vocabularies plus generic filler, and dense vectors built from the same topics, so a
+job can be close to the candidate without sharing its exact words. With --use-api the dense
+vectors come from the embeddings API instead (through the embedding cache).
+
+    python benchmarks/bench_lexical_prefilter.py
+    python benchmarks/bench_lexical_prefilter.py --jobs 200 1000 5000 --depth 25 50 100 --top-k 10
+
+The exit status is 1 when any row's mean recall@k is below --min-recall (0.9 by default).
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "backend"))
+# The backend opens its caches and stores on import; keep them away from real data
+os.environ.setdefault("SMARTINTERN_CACHE_DIR", tempfile.mkdtemp(prefix="smartintern-bench-"))
+
+from app_backend import lexical_shortlist, prefilter_depth
+from job_text import build_job_text
+from vectorDB import stable_job_id
+from ranking import normalize_rows, recall_at_k, top_k_indices
+from benchmarks.fixtures import WORDS, JOB_TITLES, PUBLISHERS, LOCATIONS, BOILERPLATE
+
+TOPICS = {
+    "data": "sql pandas dashboards tableau statistics excel reporting etl warehouse analytics bi metrics",
+    "ml": "pytorch tensorflow nlp transformers training inference features scikit-learn regression deep-learning",
+    "backend": "django flask fastapi postgres redis microservices rest grpc kafka queues",
+    "frontend": "react typescript css html redux nextjs accessibility ui components figma",
+    "devops": "kubernetes docker terraform aws ci/cd monitoring prometheus linux ansible helm",
+    "research": "papers experiments hypothesis lab publications thesis literature simulations matlab",
+}
+DIMENSIONS = 256
+
+
+def topic_text(rng: random.Random, topic: str, words: int, focus: float) -> str:
+    """words words, a focus share of them from topic's vocabulary and the rest generic filler."""
+    vocabulary = TOPICS[topic].split()
+    return " ".join(rng.choice(vocabulary) if rng.random() < focus else rng.choice(WORDS) for _ in range(words))
+
+
+def synthetic_corpus(count: int, queries: int, seed: int) -> tuple[list[dict], list[str]]:
+    """(jobs, candidate texts); each candidate leans on one topic and mentions a second."""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    jobs = []
+    for i in range(count):
+        topic = rng.choice(topics)
+        jobs.append({
+            "job_id": f"prefilter-{seed}-{count}-{i}",
+            "job_title": rng.choice(JOB_TITLES),
+            "job_publisher": rng.choice(PUBLISHERS),
+            "job_employment_type": rng.choice(["FULLTIME", "INTERN", "CONTRACTOR"]),
+            "job_location": rng.choice(LOCATIONS),
+            "job_description": f"{topic_text(rng, topic, rng.randint(80, 300), rng.uniform(0.1, 0.4))}. {BOILERPLATE}",
+        })
+    candidates = []
+    for _ in range(queries):
+        main, secondary = rng.sample(topics, 2)
+        candidates.append(f"{topic_text(rng, main, 60, 0.3)} {topic_text(rng, secondary, 20, 0.3)}")
+    return jobs, candidates
+
+
+class SyntheticEmbedder:
+    """
+    Bag-of-words vectors: every word gets a random vector, topic words sit around their
+    topic's direction, and a text is the mean of its words plus noise.
+    """
+
+    def __init__(self, seed: int):
+        self.rng = np.random.default_rng(seed)
+        centers = {topic: self.rng.standard_normal(DIMENSIONS, dtype=np.float32) for topic in TOPICS}
+        self.word_vectors = {}
+        for topic, vocabulary in TOPICS.items():
+            for word in vocabulary.split():
+                self.word_vectors[word] = centers[topic] + 0.7 * self.rng.standard_normal(DIMENSIONS, dtype=np.float32)
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        rows = []
+        for text in texts:
+            words = text.lower().split()
+            for word in words:
+                if word not in self.word_vectors:
+                    self.word_vectors[word] = self.rng.standard_normal(DIMENSIONS, dtype=np.float32)
+            mean = np.mean([self.word_vectors[word] for word in words], axis=0)
+            rows.append(mean + 0.05 * self.rng.standard_normal(DIMENSIONS, dtype=np.float32))
+        return normalize_rows(rows)
+
+
+def api_embedder(texts: list[str]) -> np.ndarray:
+    from agents.embed import embed_texts
+    vectors, _ = embed_texts(texts)
+    return normalize_rows(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--depth", type=int, nargs="+", help="fixed shortlist depths (default: the backend's depth per job count)")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--use-api", action="store_true", help="embed with the embeddings API instead of synthetic vectors")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="exit 1 when any row's recall@k is below this")
+    args = parser.parse_args()
+
+    embed = api_embedder if args.use_api else SyntheticEmbedder(args.seed)
+    failures = []
+    print(f"recall@{args.top_k} of the dense ranking over the BM25 shortlist vs over every job, {args.queries} candidates")
+    print(f"{'jobs':>6} {'depth':>6} {'recall@k':>9} {'min':>6} {'ms / shortlist':>15}")
+    for count in args.jobs:
+        jobs, candidates = synthetic_corpus(count, args.queries, args.seed)
+        job_texts = [build_job_text(job) for job in jobs]
+        job_ids = [stable_job_id(job) for job in jobs]
+        job_matrix = embed(job_texts)
+        candidate_matrix = embed(candidates)
+        exhaustive = top_k_indices(candidate_matrix @ job_matrix.T, args.top_k)
+
+        for depth in args.depth or [prefilter_depth(count)]:
+            recalls, durations = [], []
+            for candidate_text, candidate_vector, expected in zip(candidates, candidate_matrix, exhaustive):
+                start = time.perf_counter()
+                shortlist = lexical_shortlist(job_ids, job_texts, candidate_text, depth)
+                durations.append(time.perf_counter() - start)
+                order = top_k_indices(candidate_vector @ job_matrix[shortlist].T, args.top_k)[0]
+                recalls.append(recall_at_k([shortlist[i] for i in order], expected, args.top_k))
+            recall = statistics.mean(recalls)
+            print(f"{count:>6} {depth:>6} {recall:>9.3f} {min(recalls):>6.2f} {statistics.median(durations) * 1000:>15.2f}",
+                  flush=True)
+            if recall < args.min_recall:
+                failures.append(f"{count} jobs, depth {depth}: recall@{args.top_k} {recall:.3f}")
+
+    for failure in failures:
+        print(f"LOW RECALL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
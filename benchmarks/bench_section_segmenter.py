@@ -0,0 +1,88 @@
+"""
+Compares the single-pass section segmenter with the old per-section extract_section scans.
+
+Runs both on synthetic resumes of 10 to 50 pages (no network, no spaCy model needed), after
+checking the segmenter's sections on resumes with realistic headings ("PROFESSIONAL
+EXPERIENCE", "Technical Skills & Tools", ...) against what each section should hold and
+against what the old scans found. Exits 1 when the segmenter misses a section.
+
+    python benchmarks/bench_section_segmenter.py --pages 10 25 50 --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.resume_parser import extract_section, segment_resume
+from benchmarks.fixtures import synthetic_resume, realistic_resume, REALISTIC_HEADINGS
+
+
+# The sections as traditional_resume_parser scanned them before the segmenter
+def legacy_sections(text: str) -> dict:
+    summary_match = re.search(r"(?s)(.*?)(?=\n(?:education|experience|skills|projects|internships|certifications|achievements)\b)", text, re.IGNORECASE)
+    return {
+        "summary": summary_match.group(1) if summary_match else "",
+        "education": extract_section(text, ["education", "academic background"], ["experience", "skills", "projects", "certifications"]),
+        "experience": extract_section(text, ["experience", "work experience"], ["skills", "projects", "education", "certifications"]),
+        "skills": extract_section(text, ["skills", "technical skills"], ["experience", "projects", "education", "certifications"]),
+        "projects": extract_section(text, ["projects"], ["experience", "education", "certifications"]),
+        "internships": extract_section(text, ["internships"], ["experience", "education", "projects"]),
+        "certifications": extract_section(text, ["certifications"], ["experience", "education", "projects"]),
+        "achievements": extract_section(text, ["achievements", "accomplishments"], ["experience", "education", "projects"]),
+    }
+
+
+def check_realistic_headings() -> list[str]:
+    """Problems found on the REALISTIC_HEADINGS layouts; empty when the segmenter got every section."""
+    problems = []
+    for layout, headings in enumerate(REALISTIC_HEADINGS):
+        text, expected = realistic_resume(headings, seed=layout)
+        summary, sections = segment_resume(text)
+        legacy = legacy_sections(text)
+        if not summary:
+            problems.append(f"layout {layout}: empty summary")
+        for section, lines in expected.items():
+            missing = [line for line in lines if line not in sections[section]]
+            if missing:
+                problems.append(f"layout {layout}: {section} ({headings[section]!r}) is missing {len(missing)} of {len(lines)} lines"
+                                + (" that the old scan found" if legacy[section] else ""))
+    return problems
+
+
+def time_it(function, text: str, runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(text)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    problems = check_realistic_headings()
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+    print(f"Realistic headings: {len(REALISTIC_HEADINGS)} layouts, {len(problems)} problems\n")
+
+    print(f"{'pages':>5} {'chars':>9} {'legacy ms':>10} {'segmenter ms':>13} {'speedup':>8}")
+    for pages in args.pages:
+        text = synthetic_resume(pages)
+        legacy = time_it(legacy_sections, text, args.runs)
+        segmenter = time_it(segment_resume, text, args.runs)
+        print(f"{pages:>5} {len(text):>9} {legacy * 1000:>10.2f} {segmenter * 1000:>13.2f} {legacy / segmenter:>7.1f}x")
+
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
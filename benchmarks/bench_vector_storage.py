@@ -0,0 +1,114 @@
+"""
+Memory and ranking quality of compact job vector storage.
+
+For every embedding size (full 1536 or shortened, like EMBEDDING_DIMENSIONS) and storage
+dtype (float32 / float16 / int8), reports the memory per 100k jobs, the time to score one
+candidate against all jobs, and how many of the exact top k (float32, full size) are
+still in the top k. Synthetic embeddings (no network): clustered vectors whose variance
+falls off across dimensions, the way shortened text-embedding-3 vectors keep the leading ones.
+
+    python benchmarks/bench_vector_storage.py --jobs 20000 --dims 1536 512 256 --top-k 10
+
+With faiss installed, the same is measured for the scalar-quantized FAISS indexes the
+job corpus uses (JOB_INDEX_DTYPE).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from agents.vector_quantization import VECTOR_DTYPES, quantize_rows, quantized_scores
+from ranking import normalize_rows, top_k_indices
+
+FULL_DIMENSIONS = 1536
+PER_JOBS = 100_000
+
+
+def synthetic_embeddings(count: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors around `clusters` topics, with per-dimension spread decaying like 1/sqrt(i)."""
+    spread = 1.0 / np.sqrt(np.arange(1, FULL_DIMENSIONS + 1, dtype=np.float32))
+    centers = rng.standard_normal((clusters, FULL_DIMENSIONS), dtype=np.float32) * spread
+    vectors = centers[rng.integers(0, clusters, count)]
+    vectors += 0.6 * rng.standard_normal((count, FULL_DIMENSIONS), dtype=np.float32) * spread
+    return normalize_rows(vectors)
+
+
+# What the API returns for a shorter `dimensions`: the leading values, renormalized
+def shorten(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    return normalize_rows(vectors[:, :dimensions])
+
+
+def agreement(expected: np.ndarray, got: np.ndarray) -> float:
+    """Mean share of each query's expected top k found in its retrieved top k."""
+    return float(np.mean([len(set(e) & set(g)) / len(e) for e, g in zip(expected, got)]))
+
+
+def numpy_rows(jobs, queries, exact, dims: list[int], top_k: int):
+    for dimensions in dims:
+        job_matrix, query_matrix = shorten(jobs, dimensions), shorten(queries, dimensions)
+        for dtype in VECTOR_DTYPES:
+            codes, scales = quantize_rows(job_matrix, dtype)
+            stored = codes.nbytes + (scales.nbytes if dtype == "int8" else 0)
+            start = time.perf_counter()
+            scores = quantized_scores(query_matrix, codes, scales)
+            seconds = (time.perf_counter() - start) / len(query_matrix)
+            found = top_k_indices(scores, top_k)
+            yield "numpy", dimensions, dtype, stored / len(jobs) * PER_JOBS, seconds, agreement(exact, found)
+
+
+def faiss_rows(jobs, queries, exact, dims: list[int], top_k: int):
+    import faiss
+    qtypes = {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+    for dimensions in dims:
+        job_matrix, query_matrix = shorten(jobs, dimensions), shorten(queries, dimensions)
+        for dtype in VECTOR_DTYPES:
+            if dtype == "float32":
+                index = faiss.IndexFlatIP(dimensions)
+            else:
+                index = faiss.IndexScalarQuantizer(dimensions, qtypes[dtype], faiss.METRIC_INNER_PRODUCT)
+                index.train(job_matrix)
+            index.add(job_matrix)
+            stored = faiss.serialize_index(index).nbytes
+            start = time.perf_counter()
+            _, found = index.search(query_matrix, top_k)
+            seconds = (time.perf_counter() - start) / len(query_matrix)
+            yield "faiss", dimensions, dtype, stored / len(jobs) * PER_JOBS, seconds, agreement(exact, found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20000, help="jobs generated (memory is reported per 100k)")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--dims", type=int, nargs="+", default=[1536, 512, 256])
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    jobs = synthetic_embeddings(args.jobs, args.clusters, rng)
+    queries = synthetic_embeddings(args.queries, args.clusters, rng)
+    # Ground truth: exact float32 scores at full size
+    exact = top_k_indices(queries @ jobs.T, args.top_k)
+
+    backends = [numpy_rows]
+    try:
+        import faiss  # noqa: F401
+        backends.append(faiss_rows)
+    except ImportError:
+        print("faiss not installed: skipping the FAISS index rows", flush=True)
+
+    print(f"{args.jobs} jobs, {args.queries} queries, agreement = share of the exact float32/{FULL_DIMENSIONS} top {args.top_k}")
+    print(f"{'backend':<7} {'dims':>5} {'dtype':<8} {'MB / 100k jobs':>15} {'ms / query':>11} {'top-k agreement':>16}")
+    for backend in backends:
+        for name, dimensions, dtype, stored_bytes, seconds, overlap in backend(jobs, queries, exact, args.dims, args.top_k):
+            print(f"{name:<7} {dimensions:>5} {dtype:<8} {stored_bytes / 2**20:>15.1f} {seconds * 1000:>11.2f} {overlap:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Synthetic, seeded inputs for the benchmarks: resumes (as text, PDF and DOCX bytes),
+JSearch-shaped jobs, chat histories and embedding matrices. Nothing touches the network.
+"""
+import io
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+# Roughly what one page of extracted PDF text holds
+CHARS_PER_PAGE = 3000
+
+WORDS = (
+    "designed built led python data pipeline model team latency service api cloud research "
+    "analysis deployed improved reduced students course project system learning customer"
+).split()
+
+SECTIONS = ["Education", "Work Experience", "Skills", "Projects", "Internships", "Certifications", "Achievements"]
+
+JOB_TITLES = ["Data Analyst Intern", "Software Engineer", "Machine Learning Engineer", "Backend Developer",
+              "Research Intern", "Product Analyst", "DevOps Engineer", "Frontend Developer"]
+PUBLISHERS = ["LinkedIn", "Indeed", "Glassdoor", "ZipRecruiter", "Company Website"]
+LOCATIONS = ["Bengaluru, India", "Remote", "London, UK", "New York, NY", "Berlin, Germany"]
+BOILERPLATE = ("We are an equal opportunity employer and value diversity. Benefits include health, dental "
+               "and vision insurance. Competitive salary and paid time off.")
+
+
+def synthetic_resume(pages: int, seed: int = 0) -> str:
+    """A messy resume: long bullet lists, heading words inside sentences, repeated sections."""
+    rng = random.Random(seed)
+    lines = ["Sample Candidate", "sample@example.com | +1 555 010 0000", "Engineer with experience in skills and projects."]
+    size = sum(len(line) for line in lines)
+    while size < pages * CHARS_PER_PAGE:
+        heading = rng.choice(SECTIONS)
+        lines.append(heading.upper() if rng.random() < 0.5 else f"{heading}:")
+        for _ in range(rng.randint(5, 30)):
+            line = "• " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18)))
+            lines.append(line)
+            size += len(line)
+    return "\n".join(lines)
+
+
+# Heading spellings seen on real resumes, one layout per dict; sections not listed are left out
+REALISTIC_HEADINGS = [
+    {"experience": "PROFESSIONAL EXPERIENCE", "projects": "ACADEMIC PROJECTS", "education": "Education & Certifications",
+     "skills": "Technical Skills & Tools"},
+    {"experience": "Work Experience:", "projects": "Personal Projects", "education": "EDUCATION",
+     "skills": "Skills and Interests", "achievements": "Key Achievements"},
+    {"experience": "Relevant Experience", "projects": "Projects -", "education": "Academic Background",
+     "skills": "Core Skills", "internships": "Internships", "certifications": "Certifications"},
+    {"experience": "• Employment History", "projects": "Selected Projects:", "education": "Education:",
+     "skills": "SKILLS", "achievements": "Accomplishments"},
+    # Bulleted "Label: ..." lines inside a section belong to it, not to the section they name
+    {"experience": "Experience", "projects": "Projects", "skills": "SKILLS",
+     "inline_labels": {"experience": "- Skills: Python, Go"}},
+    {"internships": "Internships:", "education": "Education", "skills": "Technical Skills",
+     "inline_labels": {"internships": "• Education: campus research assistant", "education": "• Projects - thesis"}},
+]
+
+
+def realistic_resume(headings: dict, seed: int = 0) -> tuple[str, dict]:
+    """
+    A resume laid out with the given headings, and the lines each section should hold.
+    headings["inline_labels"] maps a section to a "- Label: ..." line to end it with.
+    """
+    rng = random.Random(seed)
+    lines = ["Sample Candidate", "sample@example.com | +1 555 010 0000",
+             "Engineer with experience shipping projects and learning new skills."]
+    inline_labels = headings.get("inline_labels", {})
+    expected = {}
+    for section, heading in headings.items():
+        if section == "inline_labels":
+            continue
+        lines.append(heading)
+        expected[section] = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 12))) for _ in range(rng.randint(2, 5))]
+        lines += [f"• {line}" for line in expected[section]]
+        if section in inline_labels:
+            lines.append(inline_labels[section])
+            expected[section].append(inline_labels[section].strip("•●- \t"))
+    return "\n".join(lines), expected
+
+
+def synthetic_pdf(text: str) -> bytes:
+    """text laid out on A4 pages with PyMuPDF, about CHARS_PER_PAGE characters per page."""
+    import fitz
+    lines = text.split("\n")
+    lines_per_page = 60
+    document = fitz.open()
+    for start in range(0, len(lines), lines_per_page):
+        page = document.new_page()
+        page.insert_text((40, 40), "\n".join(line[:110] for line in lines[start:start + lines_per_page]), fontsize=8)
+    contents = document.tobytes()
+    document.close()
+    return contents
+
+
+def synthetic_docx(text: str) -> bytes:
+    """A minimal .docx (one paragraph per line) built with zipfile, so python-docx isn't needed."""
+    paragraphs = "".join(f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(line)}</w:t></w:r></w:p>"
+                         for line in text.split("\n"))
+    files = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/></Relationships>'
+        ),
+        "word/document.xml": (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>'
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, contents in files.items():
+            archive.writestr(name, contents)
+    return buffer.getvalue()
+
+
+def synthetic_jobs(count: int, seed: int = 0) -> list[dict]:
+    """JSearch-shaped job dicts with 150-600 word descriptions, some boilerplate included."""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        description = " ".join(rng.choice(WORDS) for _ in range(rng.randint(150, 600)))
+        jobs.append({
+            "job_id": f"job-{seed}-{i}",
+            "job_title": rng.choice(JOB_TITLES),
+            "job_publisher": rng.choice(PUBLISHERS),
+            "job_employment_type": rng.choice(["FULLTIME", "INTERN", "CONTRACTOR"]),
+            "job_location": rng.choice(LOCATIONS),
+            "job_apply_link": f"https://jobs.example.com/{seed}/{i}",
+            "job_description": f"{description}. {BOILERPLATE}",
+        })
+    return jobs
+
+
+def synthetic_resume_summary() -> dict:
+    return {
+        "Name": "Sample Candidate",
+        "Country": "India",
+        "Summary": " ".join(WORDS * 8),
+        "Projects": [f"Project {i}: " + " ".join(WORDS[i:i + 10]) for i in range(4)],
+    }
+
+
+def synthetic_chat(turns: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant",
+         "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 20 if i % 2 == 0 else 120)))}
+        for i in range(turns)
+    ]
+
+
+def synthetic_vectors(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """count x dimensions float32 matrix of Gaussian rows (not normalized)."""
+    return np.random.default_rng(seed).standard_normal((count, dimensions), dtype=np.float32)
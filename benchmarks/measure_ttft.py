@@ -0,0 +1,59 @@
+"""
+Measures time-to-first-token of the chat endpoints.
+
+Compares the blocking /get_query_response/ (first token == full reply) with the
+server-sent events /get_query_response/stream. Point the backend at
+benchmarks/stub_llm_server.py for reproducible numbers:
+
+    python benchmarks/measure_ttft.py --backend http://127.0.0.1:8000 --runs 20
+"""
+import argparse
+import statistics
+import time
+
+import httpx
+
+SAMPLE_REQUEST = {
+    "query": "What kind of roles should I look for?",
+    "resume_summary": {
+        "Name": "Sample Candidate",
+        "Country": "India",
+        "Summary": "Final-year computer science student with projects in NLP and computer vision.",
+        "Projects": ["Resume parser", "Image captioning model"],
+    },
+    "chat_history": [{"role": "user", "content": "What kind of roles should I look for?"}],
+}
+
+def time_blocking(client: httpx.Client, backend: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    response = client.post(f"{backend}/get_query_response/", json=SAMPLE_REQUEST)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+def time_streaming(client: httpx.Client, backend: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    first_token = None
+    with client.stream("POST", f"{backend}/get_query_response/stream", json=SAMPLE_REQUEST) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if first_token is None and line.startswith("data: "):
+                first_token = time.perf_counter() - start
+    return first_token, time.perf_counter() - start
+
+def summarize(name: str, samples: list[tuple[float, float]]):
+    ttft = sorted(sample[0] for sample in samples)
+    total = sorted(sample[1] for sample in samples)
+    p95 = ttft[min(len(ttft) - 1, int(round(0.95 * (len(ttft) - 1))))]
+    print(f"{name:<10} ttft median {statistics.median(ttft) * 1000:8.1f} ms   "
+          f"ttft p95 {p95 * 1000:8.1f} ms   total median {statistics.median(total) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time-to-first-token for the chat endpoints")
+    parser.add_argument("--backend", default="http://127.0.0.1:8000")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with httpx.Client(timeout=120.0) as client:
+        summarize("blocking", [time_blocking(client, args.backend) for _ in range(args.runs)])
+        summarize("streaming", [time_streaming(client, args.backend) for _ in range(args.runs)])
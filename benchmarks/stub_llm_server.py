@@ -0,0 +1,103 @@
+"""
+Local stand-in for the OpenAI chat completions API, used to measure latency
+without network noise or token spend.
+
+Run:
+    python benchmarks/stub_llm_server.py --port 9000 --first-token-delay 0.5 --token-delay 0.02
+
+Then start the backend against it:
+    cd backend && OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=stub uvicorn app_backend:app --port 8000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI()
+
+# Overridden from the command line
+SETTINGS = {"first_token_delay": 0.5, "token_delay": 0.02, "tokens": 200}
+
+STUB_WORDS = ("Thanks for sharing your background. Based on your projects in machine learning "
+              "and data engineering, entry-level AI roles look like a strong fit. ").split()
+
+def stub_tokens(count: int) -> list[str]:
+    return [STUB_WORDS[i % len(STUB_WORDS)] + " " for i in range(count)]
+
+def completion_chunk(completion_id: str, model: str, content=None, finish_reason=None) -> dict:
+    delta = {"content": content} if content is not None else {}
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+# Fills a function's JSON-schema parameters with stub text, for requests that pass tools
+def stub_arguments(parameters: dict, text: str) -> dict:
+    arguments = {}
+    for name, schema in parameters.get("properties", {}).items():
+        arguments[name] = [text] if schema.get("type") == "array" else text
+    return arguments
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    tokens = stub_tokens(SETTINGS["tokens"])
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(SETTINGS["first_token_delay"])
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(SETTINGS["token_delay"])
+                yield f"data: {json.dumps(completion_chunk(completion_id, model, token))}\n\n"
+            yield f"data: {json.dumps(completion_chunk(completion_id, model, finish_reason='stop'))}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # Non-streaming callers wait for the whole completion, just like the real API
+    await asyncio.sleep(SETTINGS["first_token_delay"] + SETTINGS["token_delay"] * (len(tokens) - 1))
+    message = {"role": "assistant", "content": "".join(tokens).strip()}
+    if body.get("tools"):
+        function = body["tools"][0]["function"]
+        message = {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:12]}",
+            "type": "function",
+            "function": {
+                "name": function["name"],
+                "arguments": json.dumps(stub_arguments(function.get("parameters", {}), message["content"])),
+            },
+        }]}
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if body.get("tools") else "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--first-token-delay", type=float, default=SETTINGS["first_token_delay"])
+    parser.add_argument("--token-delay", type=float, default=SETTINGS["token_delay"])
+    parser.add_argument("--tokens", type=int, default=SETTINGS["tokens"])
+    args = parser.parse_args()
+
+    SETTINGS.update(first_token_delay=args.first_token_delay, token_delay=args.token_delay, tokens=args.tokens)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
@@ -59,8 +59,35 @@ st.session_state.top_k = st.selectbox(
 
 st.session_state.country = selected_country
 
+# Ranking against every job the backend has seen, not just the latest search
+st.session_state.search_all_jobs = st.checkbox("Also match against previously seen jobs", value=False)
+
 # ------------------------------------------------------- Functions for making API calls ------------------------------------------
 
+# Creating the backend session that keeps the resume, chat history and jobs server-side.
+# Whatever is known locally is uploaded once, so an expired session can be restored.
+def create_backend_session():
+    response = requests.post(f"{BACKEND_URL}/sessions/", json={
+        "country": st.session_state.country,
+        "resume_summary": st.session_state.get("resume_summary"),
+        "chat_history": st.session_state.chat_history
+    })
+    response.raise_for_status()
+    st.session_state.session_id = response.json()["session_id"]
+
+# Posting to a session-aware endpoint; only the session ID and the new data are sent
+def post_to_session(path: str, payload: dict, **kwargs):
+    if "session_id" not in st.session_state:
+        create_backend_session()
+
+    response = requests.post(f"{BACKEND_URL}{path}", json={**payload, "session_id": st.session_state.session_id}, **kwargs)
+    if response.status_code == 404:
+        # The session expired on the backend: restore it from local state and retry once
+        response.close()
+        create_backend_session()
+        response = requests.post(f"{BACKEND_URL}{path}", json={**payload, "session_id": st.session_state.session_id}, **kwargs)
+    return response
+
 if st.button("Parse Resume") and uploaded_file is not None and st.session_state.country:
     with st.spinner("Parsing resume..."):
         
@@ -70,6 +97,8 @@ if st.button("Parse Resume") and uploaded_file is not None and st.session_state.
                      uploaded_file.type)
         }
         data = {"country": st.session_state.country}
+        if "session_id" in st.session_state:
+            data["session_id"] = st.session_state.session_id
         
         # API call to parse the resume
         try:
@@ -86,12 +115,12 @@ if st.button("Parse Resume") and uploaded_file is not None and st.session_state.
             st.error("An error occurred while parsing your resume.")
             st.write(str(e))
             
-# Retrieving the jobs based on the resume and chat history
-@st.cache_data
-def get_job_listings(country, resume_summary, chat_history):
+# Retrieving the jobs based on the resume and chat history stored in the backend session.
+# The jobs stay on the backend; only their count comes back.
+def get_job_listings(country):
     # API call to get the jobs based on the resume summary
     try:
-        response = requests.post(f"{BACKEND_URL}/retrieve_jobs/", json={"country": country, "resume_summary": resume_summary, "chat_history": chat_history})
+        response = post_to_session("/retrieve_jobs/", {"country": country})
         if response.status_code == 200:
             st.session_state.ready_to_search = True
             return response.json()
@@ -103,42 +132,49 @@ def get_job_listings(country, resume_summary, chat_history):
         st.error("An error occurred while getting jobs.")
         st.write(str(e))
 
-# getting the cover letter
-def generate_cover_letter(resume_data: dict, job_data: dict) -> dict:
-    """Call backend API to generate cover letter"""
+# Streaming the cover letter as it is written; failures are appended to errors
+def stream_cover_letter(resume_data: dict, job_data: dict, errors: list):
     try:
-        st.write("Sending request to generate cover letter...")
-        
-        response = requests.post(
-            f"{BACKEND_URL}/generate_cover_letter/",
-            json={
-                "resume_summary": resume_data,
-                "job_details": job_data
-            }
-        )
-        
-        # st.write(f"Response status: {response.status_code}")
+        with requests.post(
+            f"{BACKEND_URL}/generate_cover_letter/stream",
+            json={"resume_summary": resume_data, "job_details": job_data},
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                errors.append(f"HTTP Error {response.status_code}: {response.text}")
+                return
+
+            for event, data in iter_sse_events(response):
+                if event == "message":
+                    yield data
+                elif event == "error":
+                    errors.append(data["error"])
+    except Exception as e:
+        errors.append(f"Request Error: {str(e)}")
         
-        if response.status_code == 200:
-            result = response.json()
-            # print(result, flush=True)
-            if "error" in result:
-                st.error(f"Backend Error: {result['error']}")
-            return result
-        else:
-            st.error(f"HTTP Error {response.status_code}: {response.text}")
-            return {"error": response.text}
-    
+# Generating cover letters for several jobs in one request; yields each result as soon as it is ready
+def stream_batch_cover_letters(resume_data: dict, jobs: list[dict]):
+    try:
+        with requests.post(
+            f"{BACKEND_URL}/generate_cover_letters/batch",
+            json={"resume_summary": resume_data, "jobs": jobs},
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                st.error(f"HTTP Error {response.status_code}: {response.text}")
+                return
+
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
     except Exception as e:
         st.error(f"Request Error: {str(e)}")
-        return {"error": str(e)}
-        
-# Filtering the job listings based on the resume summary
-@st.cache_data
-def filter_job_listings(jobs, resume_summary, chat_history, top_k):
+
+# Filtering the job listings stored in the backend session based on the resume summary
+def filter_job_listings(top_k, search_all_jobs=False):
     # Filter the job listings based on the resume summary
     try:
-        filtered_jobs = requests.post(f"{BACKEND_URL}/filter_jobs/", json={'jobs': jobs, 'resume_summary': resume_summary, 'chat_history': chat_history, 'top_k': top_k})
+        filtered_jobs = post_to_session("/filter_jobs/", {'top_k': top_k, 'search_scope': "corpus" if search_all_jobs else "session"})
         if filtered_jobs.status_code == 200:
             return filtered_jobs.json()
         else:
@@ -148,17 +184,31 @@ def filter_job_listings(jobs, resume_summary, chat_history, top_k):
         st.error("An error occurred while filtering jobs.")
         st.write(str(e))
     
-# Getting Response from Chatbot
-@st.cache_data
-def get_chatbot_response(user_query, resume_summary, chat_history):
-    # API call to get the chatbot response
+# Parsing a server-sent events response into (event, data) pairs
+def iter_sse_events(response):
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event = "message"
+        elif line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
+# Streaming the chatbot response token by token from the server-sent events endpoint.
+# Only the new message is sent; the backend session holds the resume and the history.
+def stream_chatbot_response(user_query):
     try:
-        response = requests.post(f"{BACKEND_URL}/get_query_response/", json={"query": user_query, "resume_summary": resume_summary, "chat_history": chat_history})
-        if response.status_code == 200:
-            return response.json()
-        else:
-            st.error("Error getting response from the chatbot")
-            return None
+        with post_to_session("/get_query_response/stream", {"query": user_query}, stream=True) as response:
+            if response.status_code != 200:
+                st.error("Error getting response from the chatbot")
+                return
+
+            for event, data in iter_sse_events(response):
+                if event == "message":
+                    yield data
+                elif event == "error":
+                    st.error(data["error"])
     except Exception as e:
         st.error("An error occurred while getting the chatbot response.")
         st.write(str(e))
@@ -174,18 +224,18 @@ for msg in st.session_state.chat_history:
 user_query = st.chat_input("Ask me anything about job search with respect to your resume!")
 
 if user_query:
-    # Add user query to chat history
     st.chat_message("user").markdown(user_query)    
     # st.session_state.job_queries.append(user_query)
+    
+    # Call backend with query, rendering tokens as they arrive
+    with st.chat_message("assistant"):
+        assistant_reply = st.write_stream(stream_chatbot_response(user_query))
+
+    # Add both turns to the local chat history (the backend session records them too)
     st.session_state.chat_history.append({
         "role": "user",
         "content": user_query
         })    
-    
-    # Call backend with query and resume summary
-    assistant_reply = get_chatbot_response(user_query, st.session_state.resume_summary, st.session_state.chat_history)
-
-    st.chat_message("assistant").markdown(assistant_reply)    
     # st.session_state.job_queries.append(assistant_reply)
     st.session_state.chat_history.append({
     "role": "assistant",
@@ -194,23 +244,30 @@ if user_query:
     
 # JOB SEARCH
 if st.button("Start Job Search"):
-    st.session_state.jobs = get_job_listings(country=st.session_state.country, resume_summary=st.session_state.resume_summary, chat_history=st.session_state.chat_history)
+    # The jobs themselves stay in the backend session; this holds {"session_id", "job_count"}
+    st.session_state.jobs = get_job_listings(country=st.session_state.country)
     # print((st.session_state.jobs[0]))
     st.success("Your job search is completed!")
 
     # else:
     # st.error("Please parse your resume first.")
     
-    st.session_state.filtered_jobs = filter_job_listings(
-        st.session_state.jobs, 
-        st.session_state.resume_summary, 
-        st.session_state.chat_history, 
-        st.session_state.top_k
-        )
+    st.session_state.filtered_jobs = filter_job_listings(st.session_state.top_k, st.session_state.search_all_jobs)
     
 if "filtered_jobs" in st.session_state and st.session_state.filtered_jobs:
     st.subheader("🔍 Top Matching Jobs for You")
 
+    if st.button("📝 Generate Cover Letters for All Matches"):
+        matched_jobs = [job for job, _ in st.session_state.filtered_jobs]
+        progress = st.progress(0.0, text="Creating your cover letters...")
+        for done, result in enumerate(stream_batch_cover_letters(st.session_state.resume_summary, matched_jobs), start=1):
+            # Job expanders are numbered from 1
+            if "error" in result:
+                st.session_state.generated_cover_letters[result["index"] + 1] = {"error": result["error"]}
+            else:
+                st.session_state.generated_cover_letters[result["index"] + 1] = {"cover_letter": result["cover_letter"]}
+            progress.progress(done / len(matched_jobs), text=f"{done}/{len(matched_jobs)} cover letters ready")
+
     for i, (job, score) in enumerate(st.session_state.filtered_jobs, start=1):
         with st.expander(f"{i}. {job['job_title']} at {job['job_publisher']} — Score: {score:.2f}"):
             st.markdown(f"**🏢 Employer:** {job['job_publisher']}")
@@ -221,13 +278,21 @@ if "filtered_jobs" in st.session_state and st.session_state.filtered_jobs:
 
             # Store cover letter in session state when generated
             if st.button("📝 Generate Cover Letter", key=f"cv_btn_{i}"):
-                with st.spinner("Creating your cover letter..."):
-                    cv_response = generate_cover_letter(
-                        resume_data=st.session_state.resume_summary,
-                        job_data=job
+                # Show the letter while it is being written, then hand it over to the editor below
+                errors = []
+                stream_placeholder = st.empty()
+                with stream_placeholder.container():
+                    streamed_letter = st.write_stream(
+                        stream_cover_letter(st.session_state.resume_summary, job, errors)
                     )
-                    # Store the response in session state
-                    st.session_state.generated_cover_letters[i] = cv_response
+                stream_placeholder.empty()
+
+                if errors or not streamed_letter:
+                    cv_response = {"error": errors[0] if errors else "Cover letter generation failed"}
+                else:
+                    cv_response = {"cover_letter": streamed_letter.strip()}
+                # Store the response in session state
+                st.session_state.generated_cover_letters[i] = cv_response
 
             # Display cover letter if it exists in session state
             if i in st.session_state.generated_cover_letters:
@@ -293,6 +358,12 @@ if "filtered_jobs" in st.session_state and st.session_state.filtered_jobs:
             st.markdown("---")
             if job.get('job_apply_link'):
                 st.markdown(f"[🚀 Apply Now]({job['job_apply_link']})", unsafe_allow_html=True)
+            # The same posting found on other job boards
+            other_links = [link for link in job.get('job_apply_links', []) if link['link'] != job.get('job_apply_link')]
+            if other_links:
+                st.markdown("Also listed on: " + " · ".join(
+                    f"[{link.get('publisher') or 'Apply'}]({link['link']})" for link in other_links
+                ))
 # else:
 #     st.warning("No job matches found. Please adjust your preferences.")
 